@@ -124,7 +124,7 @@ async def create_default_dashboard(hass: HomeAssistant, entry: ConfigEntry):
             
         except (AttributeError, KeyError, ValueError, Exception) as ex:
             # If direct creation fails, create a persistent notification with instructions
-            _LOGGER.info(f"Creating dashboard notification instead of direct creation: {ex}")
+            _LOGGER.info("Creating dashboard notification instead of direct creation: %s", ex)
             
             await hass.services.async_call(
                 "persistent_notification",
@@ -580,4 +580,6 @@ async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
         manual_store[M_HOME_BATT_CAP_KWH] = float(config[CONF_BATT_CAP_KWH])
     
     # Refresh så koordinatorn får nya värden
+    st["coordinator"].invalidate_baseline_cache()
+    st["coordinator"].refresh_config_cache()
     await st["coordinator"].async_request_refresh()
@@ -1,16 +1,87 @@
 """Battery Energy Cost (BEC) module for tracking weighted average cost of energy."""
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import sys
+from collections import deque
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
 _LOGGER = logging.getLogger(__name__)
 
 STORAGE_KEY = "energy_dispatcher_bec"
 STORAGE_VERSION = 2  # Incremented for historical data support
 
+# Keep only last 30 days of history (2880 15-minute intervals)
+HISTORY_MAX_EVENTS = 2880
+
+
+class _BECStore(Store):
+    """Store that hands older BEC data to BatteryEnergyCost.async_load as-is."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Version 1 only lacks charge_history, which async_load synthesizes."""
+        return old_data
+
+
+def _intern_labels(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Intern an event's enum-like string fields in place.
+    
+    Events decoded from storage carry a fresh string per record; interning
+    makes every record share one object per source/event type.
+    """
+    for key in ("source", "event_type"):
+        value = event.get(key)
+        if isinstance(value, str):
+            event[key] = sys.intern(value)
+    return event
+
+
+def _replay_history(events: Iterable[Dict[str, Any]]) -> Tuple[float, float]:
+    """
+    Replay history events from an empty battery.
+    
+    Pure arithmetic over the events, kept apart from the tracker state so
+    the loop only touches locals.
+    
+    Returns:
+        Tuple of (energy_kwh, wace) after the last event
+    """
+    # Start from zero. The replay carries only (energy, wace): a discharge
+    # removes energy at the current WACE, so the next charge is weighted
+    # against the remaining energy, not everything ever charged.
+    temp_energy = 0.0
+    temp_wace = 0.0
+    
+    # Replay all events, reading each event's fields once
+    for event in events:
+        event_type = event.get("event_type")
+        if event_type == "charge":
+            delta_kwh = event.get("energy_kwh", 0.0)
+            if delta_kwh > 0:
+                new_energy = temp_energy + delta_kwh
+                temp_wace = (
+                    temp_energy * temp_wace
+                    + delta_kwh * event.get("cost_sek_per_kwh", 0.0)
+                ) / new_energy
+                temp_energy = new_energy
+        
+        elif event_type == "discharge":
+            temp_energy -= abs(event.get("energy_kwh", 0.0))
+            if temp_energy < 0.0:
+                temp_energy = 0.0
+        
+        elif event_type == "reset_cost":
+            temp_wace = 0.0
+    
+    return temp_energy, temp_wace
+
 
 class BatteryEnergyCost:
     """
@@ -33,9 +104,30 @@ class BatteryEnergyCost:
         capacity_kwh: Maximum battery capacity in kWh
         energy_kwh: Current energy content in battery (kWh)
         wace: Weighted average cost of energy in battery (SEK/kWh)
-        charge_history: List of historical charging events with timestamps
+        charge_history: Bounded deque of historical charging events with timestamps
     """
 
+    # State read on every coordinator tick lives in slots; instances have no __dict__.
+    __slots__ = (
+        "hass",
+        "capacity_kwh",
+        "store",
+        "energy_kwh",
+        "wace",
+        "charge_history",
+        "_dirty",
+        "_charge_count",
+        "_discharge_count",
+        "_total_charged_kwh",
+        "_total_discharged_kwh",
+        "_charged_cost_sek",
+        "_hist_version",
+        "_recalc_version",
+        "_recalc_result",
+        "_summary_version",
+        "_summary",
+    )
+
     def __init__(self, hass: HomeAssistant, capacity_kwh: float):
         """
         Initialize the Battery Energy Cost tracker.
@@ -52,10 +144,19 @@ class BatteryEnergyCost:
             
         self.hass = hass
         self.capacity_kwh = float(capacity_kwh)
-        self.store = Store(hass, STORAGE_VERSION, f".storage/{STORAGE_KEY}")
+        self.store = _BECStore(hass, STORAGE_VERSION, f".storage/{STORAGE_KEY}")
         self.energy_kwh = 0.0  # Estimated energy currently in battery
         self.wace = 0.0  # Weighted Average Cost of Energy (SEK/kWh)
-        self.charge_history: List[Dict[str, Any]] = []  # Historical charging events
+        self._dirty = False  # Unsaved charge/discharge events (see async_save_if_dirty)
+        # Bumped on every history change; memoizes recalculate_wace_from_history()
+        self._hist_version = 0
+        self._recalc_version = -1
+        self._recalc_result = (0.0, 0.0)
+        self._summary_version = -1
+        self._summary: Dict[str, Any] = {}
+        # Historical charging events; the oldest event is dropped once full.
+        # Running totals over the events in it back get_history_summary().
+        self._replace_history(())
         
         _LOGGER.info(
             "BatteryEnergyCost initialized with capacity=%.2f kWh",
@@ -72,44 +173,68 @@ class BatteryEnergyCost:
         """
         try:
             data = await self.store.async_load()
-            if data:
-                # Load current state
-                self.energy_kwh = float(data.get("energy_kwh", 0.0))
-                self.wace = float(data.get("wace", 0.0))
-                
-                # Load historical data (version 2+)
-                self.charge_history = data.get("charge_history", [])
-                
-                # If no history exists but we have energy/wace, create initial record
-                # This handles migration from version 1
-                if not self.charge_history and (self.energy_kwh > 0 or self.wace > 0):
-                    _LOGGER.info("Migrating from storage version 1 to version 2")
-                    # Create synthetic historical record for existing state
-                    self.charge_history = [{
-                        "timestamp": datetime.now().isoformat(),
-                        "energy_kwh": self.energy_kwh,
-                        "cost_sek_per_kwh": self.wace,
-                        "soc_percent": self.get_soc(),
-                        "source": "migration",
-                        "event_type": "initial"
-                    }]
-                
-                _LOGGER.info(
-                    "Loaded battery state: energy=%.3f kWh, wace=%.3f SEK/kWh, history_records=%d",
-                    self.energy_kwh, self.wace, len(self.charge_history)
-                )
-                return True
-            else:
-                _LOGGER.debug("No persisted battery state found, using defaults")
-                return False
-        except Exception as exc:
+        except (HomeAssistantError, OSError) as exc:
             _LOGGER.error("Failed to load battery state: %s", exc)
             return False
+        
+        if not data:
+            _LOGGER.debug("No persisted battery state found, using defaults")
+            return False
+        
+        try:
+            energy_kwh = float(data.get("energy_kwh", 0.0))
+            wace = float(data.get("wace", 0.0))
+        except (AttributeError, TypeError, ValueError) as exc:
+            _LOGGER.error("Ignoring malformed battery state: %s", exc)
+            return False
+        
+        # Load current state
+        self.energy_kwh = energy_kwh
+        self.wace = wace
+        
+        # Load historical data (version 2+)
+        try:
+            self._replace_history(data.get("charge_history", ()))
+        except (AttributeError, TypeError) as exc:
+            _LOGGER.error("Discarding malformed battery charge history: %s", exc)
+            self._replace_history(())
+        
+        if not self.charge_history:
+            self._migrate_from_v1()
+        
+        _LOGGER.info(
+            "Loaded battery state: energy=%.3f kWh, wace=%.3f SEK/kWh, history_records=%d",
+            self.energy_kwh, self.wace, len(self.charge_history)
+        )
+        return True
+
+    def _migrate_from_v1(self) -> None:
+        """
+        Seed an empty history with a record of the loaded state.
+        
+        Version 1 storage only held energy/wace; without this record a later
+        recalculate_wace_from_history() would replay to an empty battery.
+        """
+        if self.energy_kwh <= 0 and self.wace <= 0:
+            return
+        _LOGGER.info("Migrating from storage version 1 to version 2")
+        self._append_event({
+            "timestamp": dt_util.now().isoformat(),
+            "energy_kwh": self.energy_kwh,
+            "cost_sek_per_kwh": self.wace,
+            "soc_percent": self.get_soc(),
+            "source": "migration",
+            "event_type": "initial"
+        })
 
     async def async_save(self) -> bool:
         """
         Persist current battery state and historical data to storage.
         
+        The Store rewrites the whole file (serialised in the executor), so
+        the full history is written each time. Tick-driven events are
+        coalesced by async_save_if_dirty() rather than saved one by one.
+        
         Returns:
             True if data was saved successfully, False otherwise
         """
@@ -117,17 +242,33 @@ class BatteryEnergyCost:
             await self.store.async_save({
                 "energy_kwh": self.energy_kwh,
                 "wace": self.wace,
-                "charge_history": self.charge_history
+                "charge_history": list(self.charge_history)
             })
+            self._dirty = False
             _LOGGER.debug(
                 "Saved battery state: energy=%.3f kWh, wace=%.3f SEK/kWh, history_records=%d",
                 self.energy_kwh, self.wace, len(self.charge_history)
             )
             return True
-        except Exception as exc:
+        except (HomeAssistantError, OSError) as exc:
             _LOGGER.error("Failed to save battery state: %s", exc)
             return False
 
+    async def async_save_if_dirty(self) -> bool:
+        """
+        Persist state only if charge/discharge events were recorded since the last save.
+        
+        on_charge() and on_discharge() run on every coordinator tick with a
+        counter change; they only mark the state dirty and the coordinator
+        flushes it periodically instead of writing storage on each event.
+        
+        Returns:
+            True if data was saved, False if there was nothing to save or saving failed
+        """
+        if not self._dirty:
+            return False
+        return await self.async_save()
+
     def set_soc(self, soc_percent: float) -> None:
         """
         Manually set the battery state of charge (SOC).
@@ -177,36 +318,24 @@ class BatteryEnergyCost:
         old_wace = self.wace
         
         # Calculate weighted average
-        total_cost = self.energy_kwh * self.wace + delta_kwh * cost_sek_per_kwh
-        self.energy_kwh += delta_kwh
+        total_cost = old_energy * old_wace + delta_kwh * cost_sek_per_kwh
+        new_energy = old_energy + delta_kwh
         
-        # Cap at capacity
-        if self.energy_kwh > self.capacity_kwh:
+        # Cap at capacity; the cost of the full delta stays in the battery
+        if new_energy > self.capacity_kwh:
             _LOGGER.warning(
                 "Battery energy %.3f kWh exceeds capacity %.3f kWh, capping",
-                self.energy_kwh, self.capacity_kwh
+                new_energy, self.capacity_kwh
             )
-            self.energy_kwh = self.capacity_kwh
+            new_energy = self.capacity_kwh
         
-        if self.energy_kwh > 0:
-            self.wace = total_cost / self.energy_kwh
+        self.energy_kwh = new_energy
+        if new_energy > 0:
+            self.wace = total_cost / new_energy
         
         # Store historical charging event
-        event = {
-            "timestamp": datetime.now().isoformat(),
-            "energy_kwh": delta_kwh,
-            "cost_sek_per_kwh": cost_sek_per_kwh,
-            "soc_percent": self.get_soc(),
-            "source": source,
-            "event_type": "charge",
-            "total_energy_after": self.energy_kwh,
-            "wace_after": self.wace
-        }
-        self.charge_history.append(event)
-        
-        # Keep only last 30 days of history (2880 15-minute intervals)
-        if len(self.charge_history) > 2880:
-            self.charge_history = self.charge_history[-2880:]
+        self._record_event("charge", delta_kwh, cost_sek_per_kwh, sys.intern(source))
+        self._dirty = True
             
         _LOGGER.info(
             "Charge event: +%.3f kWh @ %.3f SEK/kWh from %s | "
@@ -238,22 +367,9 @@ class BatteryEnergyCost:
         old_energy = self.energy_kwh
         self.energy_kwh = max(0.0, self.energy_kwh - delta_kwh)
         
-        # Store historical discharge event
-        event = {
-            "timestamp": datetime.now().isoformat(),
-            "energy_kwh": -delta_kwh,  # Negative for discharge
-            "cost_sek_per_kwh": 0.0,  # No cost for discharge
-            "soc_percent": self.get_soc(),
-            "source": "discharge",
-            "event_type": "discharge",
-            "total_energy_after": self.energy_kwh,
-            "wace_after": self.wace
-        }
-        self.charge_history.append(event)
-        
-        # Keep only last 30 days of history
-        if len(self.charge_history) > 2880:
-            self.charge_history = self.charge_history[-2880:]
+        # Store historical discharge event (negative energy, no cost)
+        self._record_event("discharge", -delta_kwh, 0.0, "discharge")
+        self._dirty = True
         
         _LOGGER.info(
             "Discharge event: -%.3f kWh | Energy: %.3f -> %.3f kWh | WACE unchanged at %.3f SEK/kWh",
@@ -274,23 +390,66 @@ class BatteryEnergyCost:
         self.wace = 0.0
         
         # Store reset event in history
-        event = {
-            "timestamp": datetime.now().isoformat(),
-            "energy_kwh": 0.0,
-            "cost_sek_per_kwh": 0.0,
-            "soc_percent": self.get_soc(),
-            "source": "manual",
-            "event_type": "reset_cost",
-            "total_energy_after": self.energy_kwh,
-            "wace_after": self.wace
-        }
-        self.charge_history.append(event)
+        self._record_event("reset_cost", 0.0, 0.0, "manual")
         
         _LOGGER.info(
             "Manual cost reset: WACE %.3f -> 0.0 SEK/kWh (energy unchanged at %.3f kWh)",
             old_wace, self.energy_kwh
         )
 
+    def _record_event(
+        self, event_type: str, energy_kwh: float, cost_sek_per_kwh: float, source: str
+    ) -> None:
+        """
+        Append a history event snapshotting the state after the change.
+        
+        Every live event is built here, so all records share one key layout
+        (the persisted format and get_charge_history() hand out these dicts).
+        """
+        self._append_event({
+            "timestamp": dt_util.now().isoformat(),
+            "energy_kwh": energy_kwh,
+            "cost_sek_per_kwh": cost_sek_per_kwh,
+            "soc_percent": self.get_soc(),
+            "source": source,
+            "event_type": event_type,
+            "total_energy_after": self.energy_kwh,
+            "wace_after": self.wace
+        })
+
+    def _replace_history(self, events) -> None:
+        """Replace the charge history and recompute its running totals."""
+        self.charge_history = deque(maxlen=HISTORY_MAX_EVENTS)
+        self._charge_count = 0
+        self._discharge_count = 0
+        self._total_charged_kwh = 0.0
+        self._total_discharged_kwh = 0.0
+        self._charged_cost_sek = 0.0
+        self._hist_version += 1
+        for event in events:
+            self._append_event(_intern_labels(event))
+
+    def _append_event(self, event: Dict[str, Any]) -> None:
+        """Append an event to the history, keeping the running totals in step."""
+        history = self.charge_history
+        if len(history) == history.maxlen:
+            self._account_event(history[0], -1)
+        history.append(event)
+        self._account_event(event, 1)
+        self._hist_version += 1
+
+    def _account_event(self, event: Dict[str, Any], sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) an event from the running totals."""
+        event_type = event.get("event_type")
+        if event_type == "charge":
+            energy = event.get("energy_kwh", 0.0)
+            self._charge_count += sign
+            self._total_charged_kwh += sign * energy
+            self._charged_cost_sek += sign * event.get("cost_sek_per_kwh", 0.0) * energy
+        elif event_type == "discharge":
+            self._discharge_count += sign
+            self._total_discharged_kwh += sign * abs(event.get("energy_kwh", 0.0))
+
     def get_soc(self) -> float:
         """
         Get the current state of charge as a percentage.
@@ -298,8 +457,9 @@ class BatteryEnergyCost:
         Returns:
             Current SOC as percentage (0-100)
         """
-        if self.capacity_kwh <= 0:
-            return 0.0
+        # capacity_kwh is validated positive in __init__. Dividing (rather than
+        # multiplying by a cached 100/capacity) keeps a full battery at exactly
+        # 100.0 for every capacity.
         return (self.energy_kwh / self.capacity_kwh) * 100.0
 
     def get_total_cost(self) -> float:
@@ -325,28 +485,12 @@ class BatteryEnergyCost:
             _LOGGER.warning("Cannot recalculate WACE: no historical data available")
             return False
         
-        # Start from zero
-        temp_energy = 0.0
-        temp_wace = 0.0
-        
-        # Replay all charge events
-        for event in self.charge_history:
-            if event.get("event_type") == "charge":
-                delta_kwh = event.get("energy_kwh", 0.0)
-                cost = event.get("cost_sek_per_kwh", 0.0)
-                
-                if delta_kwh > 0:
-                    total_cost = temp_energy * temp_wace + delta_kwh * cost
-                    temp_energy += delta_kwh
-                    if temp_energy > 0:
-                        temp_wace = total_cost / temp_energy
-            
-            elif event.get("event_type") == "discharge":
-                delta_kwh = abs(event.get("energy_kwh", 0.0))
-                temp_energy = max(0.0, temp_energy - delta_kwh)
-            
-            elif event.get("event_type") == "reset_cost":
-                temp_wace = 0.0
+        # The replay depends only on the history, so reuse the last result
+        # until an event is recorded (SOC overrides are still replaced by it)
+        if self._recalc_version != self._hist_version:
+            self._recalc_result = _replay_history(self.charge_history)
+            self._recalc_version = self._hist_version
+        temp_energy, temp_wace = self._recalc_result
         
         old_wace = self.wace
         self.wace = temp_wace
@@ -369,45 +513,39 @@ class BatteryEnergyCost:
             List of historical event dictionaries
         """
         if limit is None:
-            return self.charge_history.copy()
-        return self.charge_history[-limit:] if limit > 0 else []
+            return list(self.charge_history)
+        if limit <= 0:
+            return []
+        start = max(0, len(self.charge_history) - limit)
+        return list(islice(self.charge_history, start, None))
     
     def get_history_summary(self) -> Dict[str, Any]:
         """
         Get summary statistics from historical data.
         
+        The totals are maintained as events enter and leave the history,
+        so this does not walk the history. The summary is only rebuilt when
+        the history changes; each call returns its own copy.
+        
         Returns:
             Dictionary with summary statistics
         """
-        if not self.charge_history:
-            return {
-                "total_events": 0,
-                "charge_events": 0,
-                "discharge_events": 0,
-                "total_charged_kwh": 0.0,
-                "total_discharged_kwh": 0.0,
-                "avg_charge_cost": 0.0,
-                "oldest_event": None,
-                "newest_event": None
-            }
-        
-        charge_events = [e for e in self.charge_history if e.get("event_type") == "charge"]
-        discharge_events = [e for e in self.charge_history if e.get("event_type") == "discharge"]
-        
-        total_charged = sum(e.get("energy_kwh", 0.0) for e in charge_events)
-        total_discharged = sum(abs(e.get("energy_kwh", 0.0)) for e in discharge_events)
-        
-        # Calculate average charge cost
-        charged_costs = [e.get("cost_sek_per_kwh", 0.0) * e.get("energy_kwh", 0.0) for e in charge_events]
-        avg_cost = sum(charged_costs) / total_charged if total_charged > 0 else 0.0
-        
-        return {
-            "total_events": len(self.charge_history),
-            "charge_events": len(charge_events),
-            "discharge_events": len(discharge_events),
+        if self._summary_version == self._hist_version:
+            return dict(self._summary)
+        
+        history = self.charge_history
+        total_charged = self._total_charged_kwh
+        avg_cost = self._charged_cost_sek / total_charged if total_charged > 0 else 0.0
+        
+        self._summary = {
+            "total_events": len(history),
+            "charge_events": self._charge_count,
+            "discharge_events": self._discharge_count,
             "total_charged_kwh": total_charged,
-            "total_discharged_kwh": total_discharged,
+            "total_discharged_kwh": self._total_discharged_kwh,
             "avg_charge_cost": avg_cost,
-            "oldest_event": self.charge_history[0].get("timestamp") if self.charge_history else None,
-            "newest_event": self.charge_history[-1].get("timestamp") if self.charge_history else None
+            "oldest_event": history[0].get("timestamp") if history else None,
+            "newest_event": history[-1].get("timestamp") if history else None
         }
+        self._summary_version = self._hist_version
+        return dict(self._summary)
@@ -11,11 +11,23 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, time
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=32)
+def _parse_quiet_time(value: str) -> time:
+    """Parse an "HH:MM" (or "HH:MM:SS") quiet-hours string.
+    
+    ComfortManager is rebuilt on every coordinator update from the same
+    configured strings, so the parsed (immutable) times are cached.
+    """
+    parts = value.split(":")
+    return time(int(parts[0]), int(parts[1]))
+
+
 class ComfortManager:
     """Manages comfort-aware filtering of optimization recommendations."""
 
@@ -38,14 +50,12 @@ class ComfortManager:
         
         # Parse quiet hours if strings
         if isinstance(quiet_hours_start, str):
-            parts = quiet_hours_start.split(":")
-            self.quiet_hours_start = time(int(parts[0]), int(parts[1]))
+            self.quiet_hours_start = _parse_quiet_time(quiet_hours_start)
         else:
             self.quiet_hours_start = quiet_hours_start
             
         if isinstance(quiet_hours_end, str):
-            parts = quiet_hours_end.split(":")
-            self.quiet_hours_end = time(int(parts[0]), int(parts[1]))
+            self.quiet_hours_end = _parse_quiet_time(quiet_hours_end)
         else:
             self.quiet_hours_end = quiet_hours_end
             
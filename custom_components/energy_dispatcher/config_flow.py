@@ -97,6 +97,9 @@ CONF_WEATHER_ENTITY = "weather_entity"
 CONF_CLOUD_0 = "cloud_0_factor"
 CONF_CLOUD_100 = "cloud_100_factor"
 
+# Weather attributes that carry cloud cover, depending on the weather integration
+_CLOUD_KEYS = frozenset({"cloudiness", "cloud_coverage", "cloud_cover", "cloud"})
+
 # Manual forecast settings
 CONF_MANUAL_STEP_MINUTES = "manual_step_minutes"
 CONF_MANUAL_DIFFUSE_SKY_VIEW_FACTOR = "manual_diffuse_sky_view_factor"
@@ -105,25 +108,20 @@ CONF_MANUAL_INVERTER_AC_CAP = "manual_inverter_ac_kw_cap"
 CONF_MANUAL_CALIBRATION_ENABLED = "manual_calibration_enabled"
 
 def _available_weather_entities(hass):
-    entities = []
     if hass and hasattr(hass, "states"):
         try:
-            for state in hass.states.async_all("weather"):
-                attrs = state.attributes
-                if (
-                    "cloudiness" in attrs
-                    or "cloud_coverage" in attrs
-                    or "cloud_cover" in attrs
-                    or "cloud" in attrs
-                ):
-                    entities.append(state.entity_id)
+            return [
+                state.entity_id
+                for state in hass.states.async_all("weather")
+                if not _CLOUD_KEYS.isdisjoint(state.attributes)
+            ]
         except (AttributeError, TypeError):
             # Handle cases where:
             # - hass.states is None
             # - hass.states.async_all doesn't exist
             # - hass.states.async_all raises an error
-            pass
-    return entities
+            return []
+    return []
 
 DEFAULTS = {
     CONF_NORDPOOL_ENTITY: "",
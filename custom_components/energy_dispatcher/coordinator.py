@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import logging
 import math
+from collections import defaultdict
 from datetime import timedelta, datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, STATE_UNAVAILABLE, STATE_UNKNOWN
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import dt as dt_util
 
@@ -83,21 +86,55 @@ from .weather_optimizer import WeatherOptimizer
 
 _LOGGER = logging.getLogger(__name__)
 
+# Sensor states that carry no numeric value
+_UNAVAILABLE_STATES = frozenset({None, "", STATE_UNKNOWN, STATE_UNAVAILABLE})
+
+# Strings _safe_float maps to its default without attempting float()
+_NON_NUMERIC_STRINGS = frozenset({"", STATE_UNKNOWN, STATE_UNAVAILABLE, "None", "nan"})
+
+# An idle house counter lets the baseline skip the recorder query, but hours keep
+# leaving the rolling 48h window (and a frozen sensor looks idle too), so a
+# result is only reused for this long after it was calculated
+_BASELINE_IDLE_REUSE_MAX_AGE = timedelta(hours=1)
+
+# Battery tracking only marks the BEC dirty; it is written to storage at most
+# this often (and on Home Assistant stop / entry unload)
+BEC_FLUSH_INTERVAL = timedelta(minutes=5)
+
+# kWh per hour - ignore very small PV values (sensor noise at night) when
+# deciding whether battery charging in that hour came from the grid
+_PV_NOISE_THRESHOLD_KWH = 0.01
+
+# kWh - smallest counter change treated as a battery charge/discharge event (1 Wh)
+_MIN_ENERGY_DELTA_KWH = 0.001
+
+# Battery charge counts as solar when the PV delta over the same period covers at
+# least this share of it (5% margin for measurement tolerances)
+PV_COVERAGE_RATIO = 0.95
+
 
 def _safe_float(v: Any, default: Optional[float] = None) -> Optional[float]:
     """Tolerant parse till float. Hanterar None, unknown/unavailable och decimal‑komma."""
     if v is None:
         return default
     try:
-        if isinstance(v, (int, float)):
+        if isinstance(v, str):
+            # Sensor states arrive as str; reject the common non-numeric ones
+            # (unavailable/unknown) by lookup instead of a raised ValueError
+            if v in _NON_NUMERIC_STRINGS:
+                return default
+            s = v.strip()
+        elif isinstance(v, (int, float)):
             f = float(v)
             if math.isnan(f):
                 return default
             return f
-        s = str(v).strip()
-        if s in ("", "unknown", "unavailable", "None", "nan"):
+        else:
+            s = str(v).strip()
+        if s in _NON_NUMERIC_STRINGS:
             return default
-        s = s.replace(",", ".")
+        if "," in s:
+            s = s.replace(",", ".")
         f = float(s)
         if math.isnan(f):
             return default
@@ -153,6 +190,33 @@ def _fetch_history_for_multiple_entities(hass, start_time, end_time, entity_ids)
     return combined
 
 
+def _hourly_positive_deltas(states) -> Dict[datetime, float]:
+    """
+    Sum positive deltas of an energy counter per hour (negative deltas are counter resets).
+    
+    Each state is parsed once up front rather than twice (as start and end of
+    consecutive pairs). A pair is skipped if either value is unparseable.
+    
+    Args:
+        states: Chronological list of energy counter states
+    
+    Returns:
+        Dict mapping hour start (datetime) to kWh gained in that hour
+    """
+    values = [_safe_float(st.state) for st in states]
+    hourly: Dict[datetime, float] = defaultdict(float)
+    for i in range(len(values) - 1):
+        val_start = values[i]
+        val_end = values[i + 1]
+        if val_start is None or val_end is None:
+            continue
+        delta = val_end - val_start
+        if delta > 0:
+            hour_start = states[i].last_changed.replace(minute=0, second=0, microsecond=0)
+            hourly[hour_start] += delta
+    return hourly
+
+
 def _interpolate_energy_value(
     timestamp: datetime,
     prev_time: datetime,
@@ -187,13 +251,18 @@ def _interpolate_energy_value(
     return interpolated
 
 
-def _is_data_stale(last_update: Optional[datetime], max_age_minutes: int = 15) -> bool:
+def _is_data_stale(
+    last_update: Optional[datetime],
+    max_age_minutes: int = 15,
+    now: Optional[datetime] = None,
+) -> bool:
     """
     Check if data is too old to be considered valid.
     
     Args:
         last_update: Timestamp of last data update
         max_age_minutes: Maximum age in minutes before data is considered stale
+        now: Current time, if the caller already has it (defaults to dt_util.now())
     
     Returns:
         True if data is stale or last_update is None, False otherwise
@@ -201,7 +270,8 @@ def _is_data_stale(last_update: Optional[datetime], max_age_minutes: int = 15) -
     if last_update is None:
         return True
     
-    now = dt_util.now()
+    if now is None:
+        now = dt_util.now()
     age = (now - last_update).total_seconds() / 60.0
     return age > max_age_minutes
 
@@ -337,6 +407,11 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         
         # Historik för baseline (counter_kwh)
         self._baseline_prev_counter: Optional[Tuple[float, Any]] = None  # (kWh, ts)
+        self._baseline_cache: Optional[Dict[str, Any]] = None  # {"hour": datetime, "computed_at": datetime, "counter": kWh, "result": dict}
+        self._baseline_kwh_h: Optional[float] = None  # Last calculated baseline (unrounded)
+        self._baseline_hour: Optional[datetime] = None  # Hour the baseline was last calculated for
+        self._bec_flush_unsub: Optional[Callable[[], None]] = None  # BEC flush timer
+        self._bec_stop_unsub: Optional[Callable[[], None]] = None  # BEC flush on HA stop
         self._sf_history: List[Tuple[Any, float, float]] = []  # (ts, forecast_w, actual_w)
         
         # Battery charge/discharge tracking
@@ -350,9 +425,48 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         self._prev_house_energy: Optional[float] = None  # kWh house total (previous value)
         self._prev_grid_import_today: Optional[float] = None  # kWh grid import today (previous value)
         
+        # Tracking config resolved once (first tick) instead of walking hass.data
+        # every refresh; refresh_config_cache() re-reads it after an options update
+        self._cfg: Optional[Dict[str, Any]] = None  # hass.data[DOMAIN][entry_id]["config"]
+        self._tracking_cfg_loaded = False
+        self._bec: Optional[Any] = None
+        self._cfg_charged_entity = ""
+        self._cfg_discharged_entity = ""
+        self._cfg_pv_energy_entity = ""
+        self._cfg_house_energy_entity = ""
+        self._cfg_grid_import_entity = ""
+        self._cfg_batt_power_entity = ""
+        self._cfg_counter_entities: Tuple[str, ...] = ()  # Energy counters read each tick
+        self._batt_power_sign = 1.0  # -1.0 when the sensor reports charging as negative
+        
+        # Parsed sensor values for the refresh in progress (None outside a refresh),
+        # so entities read by several update steps are parsed once per tick
+        self._tick_floats: Optional[Dict[str, Optional[float]]] = None
+        
         # Battery override tracking
         self._battery_override: Optional[Dict[str, Any]] = None  # {"mode": str, "power_w": int, "expires_at": datetime}
 
+    async def async_shutdown(self) -> None:
+        """Cancel scheduled refreshes and timers, then flush pending BEC state."""
+        await super().async_shutdown()
+        if self._bec_flush_unsub is not None:
+            self._bec_flush_unsub()
+            self._bec_flush_unsub = None
+        if self._bec_stop_unsub is not None:
+            self._bec_stop_unsub()
+            self._bec_stop_unsub = None
+        await self._async_flush_bec()
+
+    async def _async_flush_bec(self, _now=None) -> None:
+        """Persist BEC state if battery tracking recorded events since the last save."""
+        if self._bec is not None:
+            await self._bec.async_save_if_dirty()
+
+    async def _async_flush_bec_on_stop(self, _event) -> None:
+        """Flush BEC state when Home Assistant stops (listener is single-shot)."""
+        self._bec_stop_unsub = None
+        await self._async_flush_bec()
+
     # ---------- helpers ----------
     def _get_store(self) -> Dict[str, Any]:
         if not self.entry_id:
@@ -360,8 +474,14 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         return self.hass.data.get(DOMAIN, {}).get(self.entry_id, {})
 
     def _get_cfg(self, key: str, default=None):
-        store = self._get_store()
-        cfg = store.get("config", {})
+        cfg = self._cfg
+        if cfg is None:
+            # Bind the entry config dict once; refresh_config_cache() rebinds it
+            # after async_options_updated swaps in a new dict
+            cfg = self._get_store().get("config")
+            if cfg is None:
+                return default
+            self._cfg = cfg
         return cfg.get(key, default)
 
     def _get_flag(self, key: str, default=None):
@@ -406,47 +526,107 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
             _LOGGER.info("Battery override cleared")
         self._battery_override = None
 
+    def invalidate_baseline_cache(self) -> None:
+        """Force the next refresh to recalculate the 48h baseline (e.g. after config change)."""
+        self._baseline_cache = None
+        self._baseline_hour = None
+
+    def refresh_config_cache(self) -> None:
+        """Re-read cached config (entry config dict, tracking entity ids, sign) on next use."""
+        self._cfg = None
+        self._tracking_cfg_loaded = False
+        self._bec = None
+
+    def _load_tracking_cfg(self) -> None:
+        """Resolve battery tracking entity ids and flags from the entry config."""
+        self._cfg_charged_entity = self._get_cfg(CONF_BATT_ENERGY_CHARGED_TODAY_ENTITY, "")
+        self._cfg_discharged_entity = self._get_cfg(CONF_BATT_ENERGY_DISCHARGED_TODAY_ENTITY, "")
+        self._cfg_pv_energy_entity = self._get_cfg(CONF_PV_ENERGY_TODAY_ENTITY, "")
+        self._cfg_house_energy_entity = self._get_cfg(CONF_RUNTIME_COUNTER_ENTITY, "")
+        self._cfg_grid_import_entity = self._get_cfg(CONF_GRID_IMPORT_TODAY_ENTITY, "")
+        self._cfg_batt_power_entity = self._get_cfg(CONF_BATT_POWER_ENTITY, "")
+        self._cfg_counter_entities = (
+            self._cfg_charged_entity,
+            self._cfg_discharged_entity,
+            self._cfg_pv_energy_entity,
+            self._cfg_house_energy_entity,
+            self._cfg_grid_import_entity,
+        )
+        self._batt_power_sign = -1.0 if self._get_cfg(CONF_BATT_POWER_INVERT_SIGN, False) else 1.0
+        self._tracking_cfg_loaded = True
+
     def _read_float(self, entity_id: str) -> Optional[float]:
         """Legacy: läs numeriskt värde utan att titta på enhet."""
         if not entity_id:
             return None
         st = self.hass.states.get(entity_id)
-        if not st or st.state in (None, "", "unknown", "unavailable"):
+        if not st or st.state in _UNAVAILABLE_STATES:
             return None
         return _safe_float(st.state)
 
+    def _float_state(self, entity_id: str) -> Optional[float]:
+        """Like _read_float, but parsed at most once per coordinator refresh."""
+        cache = self._tick_floats
+        if cache is None:
+            return self._read_float(entity_id)
+        try:
+            return cache[entity_id]
+        except KeyError:
+            val = cache[entity_id] = self._read_float(entity_id)
+            return val
+
+    def _snapshot_states(self, entity_ids: Tuple[str, ...]) -> Tuple[Optional[float], ...]:
+        """Parsed values for several entities at once (None for unset/unavailable)."""
+        float_state = self._float_state
+        return tuple(float_state(eid) for eid in entity_ids)
+
     def _read_watts(self, entity_id: str) -> Optional[float]:
         """Läs effekt i W, med automatisk konvertering kW/MW→W."""
         if not entity_id:
             return None
         st = self.hass.states.get(entity_id)
-        if not st or st.state in (None, "", "unknown", "unavailable"):
+        if not st or st.state in _UNAVAILABLE_STATES:
             return None
         unit = st.attributes.get("unit_of_measurement")
         return _as_watts(st.state, unit)
     
     def _read_battery_power_normalized(self) -> Optional[float]:
         """Read battery power normalized to standard convention (positive=charging)."""
-        batt_power_w = self._read_float(self._get_cfg(CONF_BATT_POWER_ENTITY, ""))
+        if not self._tracking_cfg_loaded:
+            self._load_tracking_cfg()
+        batt_power_w = self._read_float(self._cfg_batt_power_entity)
         if batt_power_w is None:
             return None
         
-        # Apply sign inversion if configured (for Huawei-style sensors)
-        invert_sign = self._get_cfg(CONF_BATT_POWER_INVERT_SIGN, False)
-        if invert_sign:
-            batt_power_w = -batt_power_w
-        
-        return batt_power_w
+        # Sign is -1.0 when inversion is configured (for Huawei-style sensors)
+        return self._batt_power_sign * batt_power_w
 
     # ---------- update loop ----------
     async def _async_update_data(self):
+        self._tick_floats = {}
+        # One timestamp for the time-of-day/date logic of this refresh
+        now = dt_util.now()
         try:
             await self._update_prices()
-            await self._update_baseline_and_runtime()
+            hour_key = now.replace(minute=0, second=0, microsecond=0)
+            if self._baseline_hour != hour_key:
+                # The baseline is cached per hour: recalculate once the hour rolls
+                # over or after invalidate_baseline_cache(); failures retry next refresh
+                await self._update_baseline_slow()
+                if self._baseline_kwh_h is not None:
+                    self._baseline_hour = hour_key
+            self._update_runtime_fast()
+            if self._bec_flush_unsub is None:
+                self._bec_flush_unsub = async_track_time_interval(
+                    self.hass, self._async_flush_bec, BEC_FLUSH_INTERVAL
+                )
+                self._bec_stop_unsub = self.hass.bus.async_listen_once(
+                    EVENT_HOMEASSISTANT_STOP, self._async_flush_bec_on_stop
+                )
             await self._update_solar()
             await self._update_pv_actual()
-            await self._update_battery_charge_tracking()
-            await self._auto_ev_tick()
+            await self._update_battery_charge_tracking(now)
+            await self._auto_ev_tick(now)
             self._update_grid_vs_batt_delta()
             self._update_solar_delta_15m()
             await self._update_optimization_plan()
@@ -468,6 +648,8 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 self.data["battery_override"] = {"active": False}
         except Exception:  # noqa: BLE001
             _LOGGER.exception("Uppdatering misslyckades")
+        finally:
+            self._tick_floats = None
         return self.data
 
     def _calculate_export_price(self, spot_price: float, current_year: int) -> float:
@@ -1272,7 +1454,7 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         amps = 0.0
         if num_current:
             st = self.hass.states.get(num_current)
-            amps = _safe_float(st.state, 0.0) if st and st.state not in ("unknown", "unavailable", None, "") else 0.0
+            amps = _safe_float(st.state, 0.0) if st and st.state not in _UNAVAILABLE_STATES else 0.0
         min_a = int(self._get_cfg(CONF_EVSE_MIN_A, 6))
         if amps and amps >= min_a:
             return True
@@ -1316,53 +1498,16 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         Returns:
             Total kWh of battery grid charging (charging without solar)
         """
-        from collections import defaultdict
-        
-        # Build hourly aggregates
-        hourly_batt_charge = defaultdict(float)
-        hourly_pv_gen = defaultdict(float)
-        
-        # Aggregate battery charging by hour
-        for i in range(len(batt_states) - 1):
-            val_start = _safe_float(batt_states[i].state)
-            val_end = _safe_float(batt_states[i + 1].state)
-            
-            if val_start is None or val_end is None:
-                continue
-            
-            ts_start = batt_states[i].last_changed
-            hour_start = ts_start.replace(minute=0, second=0, microsecond=0)
-            
-            charge_delta = val_end - val_start
-            if charge_delta > 0:  # Only count charging (ignore counter resets)
-                hourly_batt_charge[hour_start] += charge_delta
-        
-        # Aggregate PV generation by hour
-        for i in range(len(pv_states) - 1):
-            val_start = _safe_float(pv_states[i].state)
-            val_end = _safe_float(pv_states[i + 1].state)
-            
-            if val_start is None or val_end is None:
-                continue
-            
-            ts_start = pv_states[i].last_changed
-            hour_start = ts_start.replace(minute=0, second=0, microsecond=0)
-            
-            pv_delta = val_end - val_start
-            if pv_delta > 0:  # Only count generation (ignore counter resets)
-                hourly_pv_gen[hour_start] += pv_delta
-        
-        # Calculate grid charging: battery charging when no solar is present
-        # Use a small threshold (0.01 kWh) to account for negligible nighttime solar readings
-        grid_charge_total = 0.0
-        PV_THRESHOLD = 0.01  # kWh - ignore very small PV values (sensor noise at night)
-        
-        for hour_ts, batt_charge in hourly_batt_charge.items():
-            pv_gen = hourly_pv_gen.get(hour_ts, 0.0)
-            
-            # If battery is charging but PV is negligible, it's grid charging
-            if batt_charge > 0.0 and pv_gen < PV_THRESHOLD:
-                grid_charge_total += batt_charge
+        hourly_batt_charge = _hourly_positive_deltas(batt_states)
+        hourly_pv_gen = _hourly_positive_deltas(pv_states)
+        
+        # Calculate grid charging: battery charging in hours where PV is negligible.
+        # Hourly buckets only hold positive charge, so a single filtered sum suffices.
+        grid_charge_total = sum(
+            batt_charge
+            for hour_ts, batt_charge in hourly_batt_charge.items()
+            if hourly_pv_gen.get(hour_ts, 0.0) < _PV_NOISE_THRESHOLD_KWH
+        )
         
         _LOGGER.debug(
             "Battery grid charging analysis: %.3f kWh charged during periods with no solar",
@@ -1373,14 +1518,30 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
 
 
 
-    async def _calculate_48h_baseline(self) -> Optional[Dict[str, Optional[float]]]:
+    async def _calculate_48h_baseline(self, force: bool = False) -> Optional[Dict[str, Optional[float]]]:
         """
         Calculate baseline from last 48 hours using energy counter deltas.
         Returns dict with key 'overall' containing kWh/h value.
         Also includes 'failure_reason' key if calculation fails.
         Uses energy counters (kWh) to calculate consumption, excluding EV charging 
         and battery grid charging based on their respective energy counters.
+
+        A successful result is cached for the rest of the current hour, since a
+        48h average barely moves between refreshes. After the hour rolls over the
+        cached result is still reused if the house energy counter has not moved
+        (nothing consumed, so no recorder query is needed), but only up to
+        _BASELINE_IDLE_REUSE_MAX_AGE after it was calculated, since the window
+        keeps rolling. Pass force=True to bypass.
         """
+        now = dt_util.now()
+        hour_key = now.replace(minute=0, second=0, microsecond=0)
+        if (
+            not force
+            and self._baseline_cache is not None
+            and self._baseline_cache["hour"] == hour_key
+        ):
+            return self._baseline_cache["result"]
+
         lookback_hours = int(self._get_cfg(CONF_RUNTIME_LOOKBACK_HOURS, 48))
         
         # Get the required energy counter entities
@@ -1394,6 +1555,19 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 "failure_reason": "No house energy counter configured (runtime_counter_entity)"
             }
         
+        # Counter unchanged since last calculation: nothing new to integrate
+        current_counter = self._read_float(house_energy_ent)
+        if (
+            not force
+            and self._baseline_cache is not None
+            and current_counter is not None
+            and self._baseline_cache["counter"] is not None
+            and abs(current_counter - self._baseline_cache["counter"]) < 0.001
+            and now - self._baseline_cache["computed_at"] < _BASELINE_IDLE_REUSE_MAX_AGE
+        ):
+            self._baseline_cache["hour"] = hour_key
+            return self._baseline_cache["result"]
+        
         # Get optional energy counter entities for exclusions
         ev_energy_ent = self._get_cfg(CONF_EVSE_TOTAL_ENERGY_SENSOR, "")
         batt_energy_ent = self._get_cfg(CONF_BATT_TOTAL_CHARGED_ENERGY_ENTITY, "")
@@ -1405,7 +1579,7 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         try:
             from homeassistant.components.recorder import history
             
-            end = dt_util.now()
+            end = now
             start = end - timedelta(hours=lookback_hours)
             
             # Build list of entities to fetch
@@ -1508,11 +1682,13 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 net_house_kwh -= ev_delta
                 _LOGGER.debug("Excluding EV energy: %.3f kWh", ev_delta)
             
+            batt_grid_kwh = 0.0
             if exclude_batt_grid and batt_states and pv_states:
                 # Calculate battery grid charging by identifying periods where battery charged
-                # but no solar was available (i.e., forced grid charging at night)
-                batt_grid_kwh = self._calculate_battery_grid_charging(
-                    batt_states, pv_states
+                # but no solar was available (i.e., forced grid charging at night).
+                # This walks every history sample, so keep it off the event loop.
+                batt_grid_kwh = await self.hass.async_add_executor_job(
+                    self._calculate_battery_grid_charging, batt_states, pv_states
                 )
                 net_house_kwh -= batt_grid_kwh
                 _LOGGER.debug("Excluding battery grid charging: %.3f kWh (from time-based analysis)", 
@@ -1532,20 +1708,21 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 "overall": avg_kwh_per_h,
             }
             
-            # Calculate batt_grid_kwh for logging
-            batt_grid_kwh_log = 0.0
-            if exclude_batt_grid and batt_states and pv_states:
-                batt_grid_kwh_log = self._calculate_battery_grid_charging(batt_states, pv_states)
-            
             _LOGGER.debug(
                 "48h baseline calculated: overall=%.3f kWh/h "
                 "(house: %.3f kWh, ev: %.3f kWh, batt_grid: %.3f kWh over %d hours)",
                 avg_kwh_per_h,
                 house_delta, ev_delta, 
-                batt_grid_kwh_log,
+                batt_grid_kwh,
                 lookback_hours
             )
             
+            self._baseline_cache = {
+                "hour": hour_key,
+                "computed_at": now,
+                "counter": current_counter,
+                "result": results,
+            }
             return results
             
         except Exception as e:
@@ -1555,18 +1732,12 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 "failure_reason": f"Exception during calculation: {str(e)}"
             }
 
-    async def _update_baseline_and_runtime(self):
+    async def _update_baseline_slow(self):
         """
-        Calculate house baseline (kWh/h) and Battery Runtime Estimate.
-        Uses energy counters (kWh) with 48h lookback to calculate delta-based consumption.
-        Excludes EV charging and battery grid charging based on their energy counters.
+        Recalculate the 48h house baseline from recorder history.
+        Expensive (recorder query + integration), so it runs once per hour
+        (or after invalidation) rather than on every coordinator refresh.
         """
-        lookback_hours = int(self._get_cfg(CONF_RUNTIME_LOOKBACK_HOURS, 48))
-        now = dt_util.now()
-
-        visible_kwh_h: Optional[float] = None
-        source_val = None
-
         # Calculate baseline using 48h energy counter deltas
         baseline_48h = await self._calculate_48h_baseline()
         if baseline_48h and baseline_48h.get("overall") is not None:
@@ -1577,15 +1748,9 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 baseline_48h.get("overall"),
             )
             
-            # Get current house energy counter value for display
-            house_energy_ent = self._get_cfg(CONF_RUNTIME_COUNTER_ENTITY, "")
-            st = self.hass.states.get(house_energy_ent) if house_energy_ent else None
-            source_val = _safe_float(st.state) if st else None
-            
             baseline_w = None if visible_kwh_h is None else round(visible_kwh_h * 1000.0, 1)
             self.data["house_baseline_w"] = baseline_w
             self.data["baseline_method"] = "energy_counter_48h"
-            self.data["baseline_source_value"] = source_val
             self.data["baseline_kwh_per_h"] = round(visible_kwh_h, 4) if visible_kwh_h else None
             self.data["baseline_exclusion_reason"] = ""  # Already excluded in 48h calc
             
@@ -1602,22 +1767,28 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                 failure_reason
             )
             
-            # Get current house energy counter value for diagnostic display
-            house_energy_ent = self._get_cfg(CONF_RUNTIME_COUNTER_ENTITY, "")
-            st = self.hass.states.get(house_energy_ent) if house_energy_ent else None
-            source_val = _safe_float(st.state) if st else None
-            
             self.data["house_baseline_w"] = None
             self.data["baseline_method"] = "energy_counter_48h"
-            self.data["baseline_source_value"] = source_val
             self.data["baseline_kwh_per_h"] = None
             self.data["baseline_exclusion_reason"] = failure_reason
             visible_kwh_h = None
 
-        # Battery runtime (using final visible_kwh_h regardless of method)
+        self._baseline_kwh_h = visible_kwh_h
+
+    def _update_runtime_fast(self):
+        """
+        Update live values derived from the last baseline: current house counter
+        reading and Battery Runtime Estimate. Cheap, runs on every refresh.
+        """
+        # Get current house energy counter value for display/diagnostics
+        house_energy_ent = self._get_cfg(CONF_RUNTIME_COUNTER_ENTITY, "")
+        self.data["baseline_source_value"] = self._float_state(house_energy_ent)
+
+        # Battery runtime (using last calculated baseline regardless of method)
+        visible_kwh_h = self._baseline_kwh_h
         batt_cap = float(self._get_cfg(CONF_BATT_CAP_KWH, 0.0))
         soc_ent = self._get_cfg(CONF_BATT_SOC_ENTITY, "")
-        soc_state = self._read_float(soc_ent)
+        soc_state = self._float_state(soc_ent)
         soc_floor = float(self._get_cfg(CONF_RUNTIME_SOC_FLOOR, 10))
         soc_ceil = float(self._get_cfg(CONF_RUNTIME_SOC_CEILING, 95))
 
@@ -1717,7 +1888,7 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         pv_now = None
         if pv_power_entity:
             st = self.hass.states.get(pv_power_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
+            if st and st.state not in _UNAVAILABLE_STATES:
                 pv_now = _as_watts(st.state, str(st.attributes.get("unit_of_measurement", "")).lower())
                 pv_now = None if pv_now is None else round(pv_now, 1)
         self.data["pv_now_w"] = pv_now
@@ -1725,7 +1896,7 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         pv_today = None
         if pv_energy_entity:
             st = self.hass.states.get(pv_energy_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
+            if st and st.state not in _UNAVAILABLE_STATES:
                 try:
                     val = _safe_float(st.state)
                     unit = str(st.attributes.get("unit_of_measurement", "")).lower()
@@ -1741,44 +1912,66 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         self.data["pv_today_kwh"] = pv_today
 
     # ---------- Battery charge/discharge tracking ----------
-    async def _update_battery_charge_tracking(self):
+    def _first_tick_init(self, now: datetime, counters: Tuple[Optional[float], ...]) -> None:
+        """
+        Start a new tracking period (startup, new day or after a data gap).
+        Stores the current counter readings as previous values without recording
+        any charge/discharge events, since there is nothing to diff against yet.
+        """
+        charged_today, discharged_today, pv_energy_today, house_energy, grid_import_today = counters
+        self._batt_prev_charged_today = charged_today
+        self._batt_prev_discharged_today = discharged_today
+        self._prev_pv_energy_today = pv_energy_today
+        self._prev_house_energy = house_energy
+        self._prev_grid_import_today = grid_import_today
+        self._batt_last_update_time = (
+            now if charged_today is not None or discharged_today is not None else None
+        )
+        self._batt_last_reset_date = now.date()
+
+    async def _update_battery_charge_tracking(self, now: Optional[datetime] = None):
         """
         Track battery charge/discharge events using daily energy counters.
         Uses energy deltas (kWh) for accurate solar vs grid classification.
         Calls bec.on_charge() when battery charges and bec.on_discharge() when it discharges.
+        Storage writes are batched by _async_flush_bec (BEC_FLUSH_INTERVAL).
         
         Handles missing data:
         - If data is unavailable for > 1 hour, resets tracking to avoid incorrect deltas
         - Waits up to 15 minutes for data before assuming sensor is unavailable
+        
+        Args:
+            now: Timestamp of the refresh in progress (defaults to dt_util.now())
         """
-        store = self._get_store()
-        bec = store.get("bec")
+        bec = self._bec
+        if bec is None:
+            bec = self._bec = self._get_store().get("bec")
         if not bec:
             return
-        
-        # Get current date
-        now = dt_util.now()
-        current_date = now.date()
-        
-        # Check if we need to reset tracking (new day)
-        if self._batt_last_reset_date != current_date:
-            self._batt_prev_charged_today = None
-            self._batt_prev_discharged_today = None
-            self._prev_pv_energy_today = None
-            self._prev_house_energy = None
-            self._prev_grid_import_today = None
-            self._batt_last_update_time = None
-            self._batt_last_reset_date = current_date
-            _LOGGER.debug("Battery tracking reset for new day: %s", current_date)
+        if not self._tracking_cfg_loaded:
+            self._load_tracking_cfg()
         
         # Get configured entities
-        charged_entity = self._get_cfg(CONF_BATT_ENERGY_CHARGED_TODAY_ENTITY, "")
-        discharged_entity = self._get_cfg(CONF_BATT_ENERGY_DISCHARGED_TODAY_ENTITY, "")
+        charged_entity = self._cfg_charged_entity
+        discharged_entity = self._cfg_discharged_entity
         
         if not charged_entity and not discharged_entity:
             # No tracking entities configured
             return
         
+        if now is None:
+            now = dt_util.now()
+        
+        # Snapshot all energy counters up front, one state lookup each
+        # (state reads are synchronous, so there is nothing to run concurrently)
+        counters = self._snapshot_states(self._cfg_counter_entities)
+        
+        # New day (or first tick after startup): only store the baseline readings
+        if self._batt_last_reset_date != now.date():
+            _LOGGER.debug("Battery tracking reset for new day: %s", now)
+            self._first_tick_init(now, counters)
+            return
+        
         # Check if previous data is too old (> 1 hour for BEC)
         # This prevents incorrect deltas when sensors were unavailable
         if self._batt_last_update_time is not None:
@@ -1789,98 +1982,54 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
                     "Resetting tracking to avoid incorrect deltas.",
                     gap_minutes
                 )
-                # Reset tracking to start fresh
-                self._batt_prev_charged_today = None
-                self._batt_prev_discharged_today = None
-                self._prev_pv_energy_today = None
-                self._prev_house_energy = None
-                self._prev_grid_import_today = None
-                self._batt_last_update_time = None
-        
-        # Get current price for charging cost calculation (the only reliable direct cost value)
-        current_price = self.data.get("current_enriched", 0.0) or 0.0
-        
-        # Get energy sensors for delta-based calculation
-        pv_energy_entity = self._get_cfg(CONF_PV_ENERGY_TODAY_ENTITY, "")
-        house_energy_entity = self._get_cfg(CONF_RUNTIME_COUNTER_ENTITY, "")
-        grid_import_entity = self._get_cfg(CONF_GRID_IMPORT_TODAY_ENTITY, "")
-        
-        # Read current energy values
-        pv_energy_today = None
-        if pv_energy_entity:
-            st = self.hass.states.get(pv_energy_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
-                pv_energy_today = _safe_float(st.state)
-        
-        house_energy = None
-        if house_energy_entity:
-            st = self.hass.states.get(house_energy_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
-                house_energy = _safe_float(st.state)
+                # Start fresh from the current readings
+                self._first_tick_init(now, counters)
+                return
         
-        grid_import_today = None
-        if grid_import_entity:
-            st = self.hass.states.get(grid_import_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
-                grid_import_today = _safe_float(st.state)
+        charged_today, discharged_today, pv_energy_today, house_energy, grid_import_today = counters
         
         # Track if we got valid data in this update cycle
         got_valid_data = False
         
         # Track charging
         if charged_entity:
-            st = self.hass.states.get(charged_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
-                charged_today = _safe_float(st.state)
-                if charged_today is not None:
-                    got_valid_data = True
-                    if self._batt_prev_charged_today is not None:
-                        delta_charged = charged_today - self._batt_prev_charged_today
-                        if delta_charged > 0.001:  # At least 1 Wh change
-                            # Determine if charging from grid or solar using energy deltas
-                            # This is the safest method - comparing kWh to kWh over the same period
-                            source = "grid"  # Default to grid (conservative)
-                            
-                            # Calculate energy deltas over the same time period
-                            delta_pv = 0.0
-                            if pv_energy_today is not None and self._prev_pv_energy_today is not None:
-                                delta_pv = max(0.0, pv_energy_today - self._prev_pv_energy_today)
-                            
-                            delta_grid_import = 0.0
-                            if grid_import_today is not None and self._prev_grid_import_today is not None:
-                                delta_grid_import = max(0.0, grid_import_today - self._prev_grid_import_today)
-                            
-                            # Determine source based on energy deltas
-                            if delta_pv > 0:
-                                # We have PV production in this period
-                                # If PV delta >= battery charge delta, it's definitely solar
-                                if delta_pv >= delta_charged * 0.95:  # 95% threshold for measurement tolerances
-                                    source = "solar"
-                                # If we have grid import data, use it for verification
-                                elif delta_grid_import > 0:
-                                    # Grid was imported, so likely grid charging
-                                    source = "grid"
-                                else:
-                                    # No grid import, PV available but less than battery charge
-                                    # This could be mixed solar/grid - be conservative
-                                    source = "grid"
-                            
-                            if source == "solar":
-                                cost = 0.0  # Solar is free
-                            else:
-                                cost = current_price  # Use enriched price (the only reliable direct cost)
-                            
-                            _LOGGER.info(
-                                "Battery charged: %.3f kWh from %s @ %.3f SEK/kWh (PV delta: %.3f kWh, Grid import: %.3f kWh)",
-                                delta_charged, source, cost, delta_pv, delta_grid_import
-                            )
-                            bec.on_charge(delta_charged, cost, source)
-                            await bec.async_save()
+            if charged_today is not None:
+                got_valid_data = True
+                prev_charged = self._batt_prev_charged_today
+                self._batt_prev_charged_today = charged_today
+                delta_charged = charged_today - prev_charged if prev_charged is not None else 0.0
+                # No-op ticks (idle battery) stop here, before any attribution work
+                if delta_charged > _MIN_ENERGY_DELTA_KWH:
+                    # Determine if charging from grid or solar using energy deltas
+                    # This is the safest method - comparing kWh to kWh over the same period
+                    prev_pv = self._prev_pv_energy_today
+                    prev_grid = self._prev_grid_import_today
+                    delta_pv = (
+                        max(0.0, pv_energy_today - prev_pv)
+                        if pv_energy_today is not None and prev_pv is not None else 0.0
+                    )
+                    delta_grid_import = (
+                        max(0.0, grid_import_today - prev_grid)
+                        if grid_import_today is not None and prev_grid is not None else 0.0
+                    )
+                    
+                    # Solar only if PV covered the charge (within measurement tolerance).
+                    # Otherwise grid or mixed solar/grid - be conservative and count it as grid.
+                    if delta_pv >= delta_charged * PV_COVERAGE_RATIO:
+                        source, cost = "solar", 0.0  # Solar is free
+                    else:
+                        # Use enriched price (the only reliable direct cost)
+                        source, cost = "grid", self.data.get("current_enriched", 0.0) or 0.0
                     
-                    self._batt_prev_charged_today = charged_today
+                    # BEC logs the event at info level; this adds the attribution inputs
+                    _LOGGER.debug(
+                        "Battery charged: %.3f kWh from %s @ %.3f SEK/kWh (PV delta: %.3f kWh, Grid import: %.3f kWh)",
+                        delta_charged, source, cost, delta_pv, delta_grid_import
+                    )
+                    bec.on_charge(delta_charged, cost, source)
             else:
                 # Data unavailable - check if we should wait or reset
-                if _is_data_stale(self._batt_last_update_time, max_age_minutes=15):
+                if _is_data_stale(self._batt_last_update_time, max_age_minutes=15, now=now):
                     _LOGGER.debug(
                         "BEC: Charged energy sensor %s unavailable for > 15 minutes, treating as no data",
                         charged_entity
@@ -1888,22 +2037,17 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
         
         # Track discharging
         if discharged_entity:
-            st = self.hass.states.get(discharged_entity)
-            if st and st.state not in (None, "", "unknown", "unavailable"):
-                discharged_today = _safe_float(st.state)
-                if discharged_today is not None:
-                    got_valid_data = True
-                    if self._batt_prev_discharged_today is not None:
-                        delta_discharged = discharged_today - self._batt_prev_discharged_today
-                        if delta_discharged > 0.001:  # At least 1 Wh change
-                            _LOGGER.info("Battery discharged: %.3f kWh", delta_discharged)
-                            bec.on_discharge(delta_discharged)
-                            await bec.async_save()
-                    
-                    self._batt_prev_discharged_today = discharged_today
+            if discharged_today is not None:
+                got_valid_data = True
+                prev_discharged = self._batt_prev_discharged_today
+                self._batt_prev_discharged_today = discharged_today
+                delta_discharged = discharged_today - prev_discharged if prev_discharged is not None else 0.0
+                if delta_discharged > _MIN_ENERGY_DELTA_KWH:
+                    _LOGGER.debug("Battery discharged: %.3f kWh", delta_discharged)
+                    bec.on_discharge(delta_discharged)
             else:
                 # Data unavailable - check if we should wait or reset
-                if _is_data_stale(self._batt_last_update_time, max_age_minutes=15):
+                if _is_data_stale(self._batt_last_update_time, max_age_minutes=15, now=now):
                     _LOGGER.debug(
                         "BEC: Discharged energy sensor %s unavailable for > 15 minutes, treating as no data",
                         discharged_entity
@@ -1922,13 +2066,14 @@ class EnergyDispatcherCoordinator(DataUpdateCoordinator):
             self._prev_grid_import_today = grid_import_today
 
     # ---------- Auto EV tick (oförändrad logik v0) ----------
-    async def _auto_ev_tick(self):
+    async def _auto_ev_tick(self, now: Optional[datetime] = None):
         store = self._get_store()
         dispatcher = store.get("dispatcher")
         if not dispatcher:
             return
 
-        now = dt_util.now()
+        if now is None:
+            now = dt_util.now()
         if hasattr(dispatcher, "is_paused") and dispatcher.is_paused(now):
             self.data["auto_ev_setpoint_a"] = 0
             self.data["auto_ev_reason"] = "override_pause"
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Sequence
 from datetime import datetime, timedelta
 from statistics import mean, stdev
 
@@ -401,6 +401,47 @@ class CostStrategy:
         
         return net_profit
     
+    def calculate_arbitrage_profit_batch(
+        self,
+        buy_prices: Sequence[float],
+        discharge_values: Sequence[float],
+        energy_kwh: float,
+        degradation_cost_per_cycle: float,
+        battery_capacity_kwh: float,
+        efficiency: float = 0.9
+    ) -> List[float]:
+        """
+        Calculate net arbitrage profit for many buy/discharge price pairs at once.
+        
+        Each pair is scored with calculate_arbitrage_profit, sharing the energy
+        amount and battery parameters.
+        
+        Args:
+            buy_prices: Purchase prices for charging (SEK/kWh)
+            discharge_values: Avoided import prices, paired with buy_prices (SEK/kWh)
+            energy_kwh: Energy amount per transaction (kWh)
+            degradation_cost_per_cycle: Battery degradation cost per full cycle (SEK)
+            battery_capacity_kwh: Battery capacity for cycle fraction calculation (kWh)
+            efficiency: Round-trip efficiency factor (default 0.9 for 90%)
+        
+        Returns:
+            Net profit in SEK for each pair, in input order
+        
+        Raises:
+            ValueError: If buy_prices and discharge_values differ in length
+        """
+        return [
+            self.calculate_arbitrage_profit(
+                buy_price,
+                discharge_value,
+                energy_kwh,
+                degradation_cost_per_cycle,
+                battery_capacity_kwh,
+                efficiency,
+            )
+            for buy_price, discharge_value in zip(buy_prices, discharge_values, strict=True)
+        ]
+    
     def is_arbitrage_profitable(
         self,
         buy_price: float,
@@ -0,0 +1,24 @@
+"""Shared fixtures for the Energy Dispatcher tests."""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.energy_dispatcher.coordinator import (
+    _fetch_history_for_multiple_entities,
+)
+
+
+@pytest.fixture
+def history_executor():
+    """Factory for a mock hass.async_add_executor_job serving recorder history.
+
+    The recorder fetch returns the given history_data; any other executor job
+    (e.g. battery grid-charging analysis) runs inline.
+    """
+    def _make(history_data):
+        async def _run(func, *args):
+            if func is _fetch_history_for_multiple_entities:
+                return history_data
+            return func(*args)
+        return AsyncMock(side_effect=_run)
+    return _make
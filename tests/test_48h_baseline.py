@@ -1,20 +1,70 @@
 """Unit tests for 48-hour baseline calculation."""
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
+from itertools import accumulate
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from custom_components.energy_dispatcher.coordinator import EnergyDispatcherCoordinator
 
 
-@pytest.fixture
+# Fixed reference time for the synthetic history; the coordinator takes its own
+# clock from dt_util.now(), independent of the sample timestamps.
+_NOW = datetime(2024, 1, 1)
+
+# Per-hour-of-day energy deltas for the synthetic battery exclusion scenario
+# Battery charges at night (hours 0-5, 22-23): 0.5 kWh/h, no charging during day
+_BATT_NIGHT_CHARGE_KWH = tuple(0.5 if (h < 6 or h >= 22) else 0.0 for h in range(24))
+# PV generates during day (hours 8-16): 1.0 kWh/h
+_PV_DAY_GEN_KWH = tuple(1.0 if 8 <= h <= 16 else 0.0 for h in range(24))
+# House consumes steadily: 1.5 kWh/h
+_HOUSE_STEADY_KWH = (1.5,) * 24
+
+# Hourly sample times over the 48h lookback (48 hours + 1 for end point)
+_HOURLY_TIMESTAMPS = tuple(_NOW - timedelta(hours=48 - hour) for hour in range(49))
+
+
+def history_state(value, last_changed):
+    """Recorder history state stub; the baseline only reads .state and .last_changed."""
+    return SimpleNamespace(state=value, last_changed=last_changed)
+
+
+def counter_history(start, end):
+    """Two-point energy counter history spanning the 48h lookback, ending at _NOW."""
+    return [
+        history_state(start, _NOW - timedelta(hours=48)),
+        history_state(end, _NOW),
+    ]
+
+
+def hourly_counter_history(deltas_by_hour, start):
+    """Hourly energy counter history over the 48h lookback, ending at _NOW.
+
+    deltas_by_hour holds the kWh added in each hour of day.
+    """
+    totals = accumulate(deltas_by_hour[ts.hour] for ts in _HOURLY_TIMESTAMPS)
+    return [
+        history_state(f"{start + total:.1f}", ts)
+        for ts, total in zip(_HOURLY_TIMESTAMPS, totals)
+    ]
+
+
+@pytest.fixture(scope="module")
 def mock_hass():
-    """Create a mock Home Assistant instance."""
+    """Create a mock Home Assistant instance shared by the module."""
     hass = MagicMock()
     hass.data = {}
-    hass.states = MagicMock()
     return hass
 
 
+@pytest.fixture(autouse=True)
+def _reset_hass(mock_hass):
+    """Clear the shared hass after each test: config data and stubbed calls."""
+    yield
+    mock_hass.data.clear()
+    mock_hass.reset_mock(return_value=True, side_effect=True)
+
+
 @pytest.fixture
 def coordinator(mock_hass):
     """Create a coordinator instance with mocked dependencies."""
@@ -68,22 +118,9 @@ class Test48HourBaseline:
     @pytest.mark.asyncio
     async def test_invalid_sensor_values(self, coordinator, mock_hass):
         """Test diagnostic reason when sensor values are invalid (unknown/unavailable)."""
-        now = datetime.now()
-        
         # House energy counter with invalid values
-        house_states = []
-        start_state = MagicMock()
-        start_state.state = "unknown"
-        start_state.last_changed = now - timedelta(hours=48)
-        house_states.append(start_state)
-        
-        end_state = MagicMock()
-        end_state.state = "unavailable"
-        end_state.last_changed = now
-        house_states.append(end_state)
-        
         history_data = {
-            "sensor.house_energy": house_states
+            "sensor.house_energy": counter_history("unknown", "unavailable")
         }
         
         with patch('homeassistant.components.recorder.history'):
@@ -97,24 +134,9 @@ class Test48HourBaseline:
     @pytest.mark.asyncio
     async def test_baseline_calculation_with_data(self, coordinator, mock_hass):
         """Test baseline calculation with energy counter data."""
-        # Create mock state objects for energy counters
-        now = datetime.now()
-        
         # House energy counter: start at 100 kWh, end at 148 kWh (48 kWh consumed over 48h = 1 kWh/h)
-        house_states = []
-        start_state = MagicMock()
-        start_state.state = "100.0"
-        start_state.last_changed = now - timedelta(hours=48)
-        house_states.append(start_state)
-        
-        end_state = MagicMock()
-        end_state.state = "148.0"
-        end_state.last_changed = now
-        house_states.append(end_state)
-        
-        # Mock history response
         history_data = {
-            "sensor.house_energy": house_states
+            "sensor.house_energy": counter_history("100.0", "148.0")
         }
         
         with patch('homeassistant.components.recorder.history'):
@@ -133,35 +155,11 @@ class Test48HourBaseline:
     @pytest.mark.asyncio
     async def test_exclusion_of_ev_charging(self, coordinator, mock_hass):
         """Test that EV charging energy is excluded from baseline."""
-        now = datetime.now()
-        
-        # House energy counter: 100 kWh -> 158 kWh (58 kWh consumed over 48h)
-        house_states = []
-        house_start = MagicMock()
-        house_start.state = "100.0"
-        house_start.last_changed = now - timedelta(hours=48)
-        house_states.append(house_start)
-        
-        house_end = MagicMock()
-        house_end.state = "158.0"
-        house_end.last_changed = now
-        house_states.append(house_end)
-        
-        # EV energy counter: 50 kWh -> 60 kWh (10 kWh charged)
-        ev_states = []
-        ev_start = MagicMock()
-        ev_start.state = "50.0"
-        ev_start.last_changed = now - timedelta(hours=48)
-        ev_states.append(ev_start)
-        
-        ev_end = MagicMock()
-        ev_end.state = "60.0"
-        ev_end.last_changed = now
-        ev_states.append(ev_end)
-        
         history_data = {
-            "sensor.house_energy": house_states,
-            "sensor.ev_energy": ev_states,
+            # House energy counter: 100 kWh -> 158 kWh (58 kWh consumed over 48h)
+            "sensor.house_energy": counter_history("100.0", "158.0"),
+            # EV energy counter: 50 kWh -> 60 kWh (10 kWh charged)
+            "sensor.ev_energy": counter_history("50.0", "60.0"),
         }
         
         with patch('homeassistant.components.recorder.history'):
@@ -182,22 +180,9 @@ class TestEnergyCounterBaseline:
     @pytest.mark.asyncio
     async def test_baseline_with_counter_reset(self, coordinator, mock_hass):
         """Test that counter resets are handled correctly."""
-        now = datetime.now()
-        
         # House energy counter with reset: 500 kWh -> 10 kWh (counter reset at midnight)
-        house_states = []
-        house_start = MagicMock()
-        house_start.state = "500.0"
-        house_start.last_changed = now - timedelta(hours=48)
-        house_states.append(house_start)
-        
-        house_end = MagicMock()
-        house_end.state = "10.0"  # Counter reset
-        house_end.last_changed = now
-        house_states.append(house_end)
-        
         history_data = {
-            "sensor.house_energy": house_states
+            "sensor.house_energy": counter_history("500.0", "10.0")
         }
         
         with patch('homeassistant.components.recorder.history'):
@@ -211,47 +196,17 @@ class TestEnergyCounterBaseline:
                 assert 0.15 <= result["overall"] <= 0.25
     
     @pytest.mark.asyncio
-    async def test_baseline_with_battery_exclusion(self, coordinator, mock_hass):
+    async def test_baseline_with_battery_exclusion(self, coordinator, mock_hass, history_executor):
         """Test that battery grid charging is excluded (time-based analysis)."""
-        now = datetime.now()
-        
-        # Create hourly data to simulate battery charging at night (no solar)
-        house_states = []
-        batt_states = []
-        pv_states = []
-        
-        house_energy = 100.0
-        batt_energy = 20.0
-        pv_energy = 0.0
-        
-        for hour in range(49):  # 48 hours + 1 for end point
-            ts = now - timedelta(hours=48-hour)
-            
-            # House consumes steadily: 1.5 kWh/h
-            house_energy += 1.5
-            
-            # Battery charges at night (hours 0-5, 22-23): 0.5 kWh/h
-            # No charging during day
-            hour_of_day = ts.hour
-            if hour_of_day < 6 or hour_of_day >= 22:
-                batt_energy += 0.5
-            
-            # PV generates during day (hours 8-16): 1.0 kWh/h
-            if 8 <= hour_of_day <= 16:
-                pv_energy += 1.0
-            
-            house_states.append(MagicMock(state=f"{house_energy:.1f}", last_changed=ts))
-            batt_states.append(MagicMock(state=f"{batt_energy:.1f}", last_changed=ts))
-            pv_states.append(MagicMock(state=f"{pv_energy:.1f}", last_changed=ts))
-        
+        # Hourly data simulating battery charging at night (no solar), see lookup tables
         history_data = {
-            "sensor.house_energy": house_states,
-            "sensor.battery_charged_energy": batt_states,
-            "sensor.pv_total_energy": pv_states,
+            "sensor.house_energy": hourly_counter_history(_HOUSE_STEADY_KWH, 100.0),
+            "sensor.battery_charged_energy": hourly_counter_history(_BATT_NIGHT_CHARGE_KWH, 20.0),
+            "sensor.pv_total_energy": hourly_counter_history(_PV_DAY_GEN_KWH, 0.0),
         }
         
         with patch('homeassistant.components.recorder.history'):
-            mock_hass.async_add_executor_job = AsyncMock(return_value=history_data)
+            mock_hass.async_add_executor_job = history_executor(history_data)
             
             result = await coordinator._calculate_48h_baseline()
             
@@ -263,5 +218,125 @@ class TestEnergyCounterBaseline:
                 assert 1.3 <= result["overall"] <= 1.35
 
 
+class TestBaselineCache:
+    """Test hourly caching of the 48h baseline result."""
+
+    @staticmethod
+    def _history():
+        return {"sensor.house_energy": counter_history("100.0", "148.0")}
+
+    @pytest.mark.asyncio
+    async def test_result_reused_within_same_hour(self, coordinator, mock_hass):
+        """Second call in the same hour should not query history again."""
+        with patch('homeassistant.components.recorder.history'):
+            mock_hass.async_add_executor_job = AsyncMock(return_value=self._history())
+
+            first = await coordinator._calculate_48h_baseline()
+            second = await coordinator._calculate_48h_baseline()
+
+            assert first["overall"] == second["overall"]
+            assert mock_hass.async_add_executor_job.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_force_and_invalidate_bypass_cache(self, coordinator, mock_hass):
+        """force=True and invalidate_baseline_cache() both trigger a recalculation."""
+        with patch('homeassistant.components.recorder.history'):
+            mock_hass.async_add_executor_job = AsyncMock(return_value=self._history())
+
+            await coordinator._calculate_48h_baseline()
+            await coordinator._calculate_48h_baseline(force=True)
+            assert mock_hass.async_add_executor_job.await_count == 2
+
+            coordinator.invalidate_baseline_cache()
+            await coordinator._calculate_48h_baseline()
+            assert mock_hass.async_add_executor_job.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_idle_counter_skips_recorder_after_hour_change(self, coordinator, mock_hass):
+        """An unchanged house counter reuses the last result even in a new hour."""
+        counter_state = SimpleNamespace(state="148.0")
+        mock_hass.states.get = MagicMock(return_value=counter_state)
+
+        with patch('homeassistant.components.recorder.history'):
+            mock_hass.async_add_executor_job = AsyncMock(return_value=self._history())
+
+            first = await coordinator._calculate_48h_baseline()
+            # Simulate the hour rolling over
+            coordinator._baseline_cache["hour"] -= timedelta(hours=1)
+
+            second = await coordinator._calculate_48h_baseline()
+            assert second is first
+            assert mock_hass.async_add_executor_job.await_count == 1
+
+            # Counter advanced: recalculate
+            counter_state.state = "149.0"
+            coordinator._baseline_cache["hour"] -= timedelta(hours=1)
+            await coordinator._calculate_48h_baseline()
+            assert mock_hass.async_add_executor_job.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_counter_recalculates_after_max_age(self, coordinator, mock_hass):
+        """A stuck counter does not freeze the rolling baseline past the reuse limit."""
+        mock_hass.states.get = MagicMock(return_value=SimpleNamespace(state="148.0"))
+
+        with patch('homeassistant.components.recorder.history'):
+            mock_hass.async_add_executor_job = AsyncMock(return_value=self._history())
+
+            await coordinator._calculate_48h_baseline()
+            # Counter never moves, but the result is now older than the limit
+            coordinator._baseline_cache["hour"] -= timedelta(hours=2)
+            coordinator._baseline_cache["computed_at"] -= timedelta(hours=2)
+
+            await coordinator._calculate_48h_baseline()
+            assert mock_hass.async_add_executor_job.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_recalculates_on_hour_change_or_invalidation(self, coordinator):
+        """Refreshes recalculate the baseline once per hour and right after invalidation."""
+        steps = [
+            "_update_prices", "_update_solar", "_update_pv_actual",
+            "_update_battery_charge_tracking", "_auto_ev_tick",
+            "_update_optimization_plan", "_update_appliance_recommendations",
+            "_update_export_analysis", "_update_load_shift_recommendations",
+            "_update_peak_shaving_status",
+        ]
+        coordinator.data = {}
+        coordinator._baseline_kwh_h = 1.0  # Last calculation succeeded
+        # BEC flush timer already running (not the first refresh)
+        coordinator._bec_flush_unsub = MagicMock()
+
+        with patch.multiple(
+            coordinator,
+            _update_baseline_slow=AsyncMock(),
+            _update_runtime_fast=MagicMock(),
+            _update_grid_vs_batt_delta=MagicMock(),
+            _update_solar_delta_15m=MagicMock(),
+            **{step: AsyncMock() for step in steps},
+        ):
+            await coordinator._async_update_data()
+            await coordinator._async_update_data()
+            assert coordinator._update_baseline_slow.await_count == 1
+
+            coordinator.invalidate_baseline_cache()
+            await coordinator._async_update_data()
+            await coordinator._async_update_data()
+            assert coordinator._update_baseline_slow.await_count == 2
+
+            # Simulate the hour rolling over
+            coordinator._baseline_hour -= timedelta(hours=1)
+            await coordinator._async_update_data()
+            assert coordinator._update_baseline_slow.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_failure_not_cached(self, coordinator, mock_hass):
+        """Failed calculations are retried on the next refresh."""
+        with patch('homeassistant.components.recorder.history'):
+            mock_hass.async_add_executor_job = AsyncMock(return_value={})
+
+            await coordinator._calculate_48h_baseline()
+            await coordinator._calculate_48h_baseline()
+            assert mock_hass.async_add_executor_job.await_count == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -19,14 +19,15 @@ subtracting all battery charging or using the formula (battery - PV).
 """
 import pytest
 import csv
-from datetime import datetime
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import MagicMock, patch
+
+from homeassistant.util import dt as dt_util
 
 from custom_components.energy_dispatcher.coordinator import EnergyDispatcherCoordinator
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def fixtures_path():
     """Return path to test fixtures."""
     return Path(__file__).parent / "fixtures"
@@ -48,22 +49,36 @@ def load_csv_states(filepath):
             
             try:
                 # row[0] = entity_id, row[1] = state, row[2] = last_changed
-                state = MagicMock()
-                state.state = row[1]
-                state.last_changed = datetime.fromisoformat(row[2].replace('Z', '+00:00'))
-                states.append(state)
+                # dt_util.parse_datetime uses the C-level ciso8601 parser and
+                # understands the trailing 'Z' without a string copy.
+                last_changed = dt_util.parse_datetime(row[2])
             except (ValueError, IndexError):
-                pass
-    
+                continue
+            if last_changed is None:
+                continue
+            state = MagicMock()
+            state.state = row[1]
+            state.last_changed = last_changed
+            states.append(state)
     return states
 
 
+@pytest.fixture(scope="module")
+def sample_states(fixtures_path):
+    """Load each sample CSV once per module; the baseline calculation only reads them."""
+    return {
+        "house": load_csv_states(fixtures_path / "historic_total_house_energy_consumption.csv"),
+        "ev": load_csv_states(fixtures_path / "historic_EV_total_charged_energy.csv"),
+        "batt": load_csv_states(fixtures_path / "historic_total_charged_energy_to_batteries.csv"),
+        "pv": load_csv_states(fixtures_path / "historic_total_energy_from_pv.csv"),
+    }
+
+
 @pytest.fixture
 def mock_hass():
     """Create a mock Home Assistant instance."""
     hass = MagicMock()
     hass.data = {}
-    hass.states = MagicMock()
     return hass
 
 
@@ -95,10 +110,10 @@ class TestBaselineWithSampleData:
     """Test baseline calculation with real sample data."""
     
     @pytest.mark.asyncio
-    async def test_baseline_all_house_energy(self, coordinator, mock_hass, fixtures_path):
+    async def test_baseline_all_house_energy(self, coordinator, mock_hass, sample_states, history_executor):
         """Test baseline with all house energy (no exclusions)."""
-        # Load sample data
-        house_states = load_csv_states(fixtures_path / "historic_total_house_energy_consumption.csv")
+        # Sample data (loaded once per module)
+        house_states = sample_states["house"]
         
         # Disable exclusions
         mock_hass.data["energy_dispatcher"]["test_entry"]["config"]["runtime_exclude_ev"] = False
@@ -109,7 +124,7 @@ class TestBaselineWithSampleData:
         }
         
         with patch('homeassistant.components.recorder.history'):
-            mock_hass.async_add_executor_job = AsyncMock(return_value=history_data)
+            mock_hass.async_add_executor_job = history_executor(history_data)
             
             result = await coordinator._calculate_48h_baseline()
             
@@ -121,11 +136,11 @@ class TestBaselineWithSampleData:
             assert 1.57 <= result["overall"] <= 1.73, f"Expected ~1.65 kWh/h, got {result['overall']:.3f} kWh/h"
     
     @pytest.mark.asyncio
-    async def test_baseline_exclude_ev(self, coordinator, mock_hass, fixtures_path):
+    async def test_baseline_exclude_ev(self, coordinator, mock_hass, sample_states, history_executor):
         """Test baseline with EV charging excluded."""
-        # Load sample data
-        house_states = load_csv_states(fixtures_path / "historic_total_house_energy_consumption.csv")
-        ev_states = load_csv_states(fixtures_path / "historic_EV_total_charged_energy.csv")
+        # Sample data (loaded once per module)
+        house_states = sample_states["house"]
+        ev_states = sample_states["ev"]
         
         # Enable EV exclusion only
         mock_hass.data["energy_dispatcher"]["test_entry"]["config"]["runtime_exclude_ev"] = True
@@ -137,7 +152,7 @@ class TestBaselineWithSampleData:
         }
         
         with patch('homeassistant.components.recorder.history'):
-            mock_hass.async_add_executor_job = AsyncMock(return_value=history_data)
+            mock_hass.async_add_executor_job = history_executor(history_data)
             
             result = await coordinator._calculate_48h_baseline()
             
@@ -148,12 +163,12 @@ class TestBaselineWithSampleData:
             assert 1.29 <= result["overall"] <= 1.43, f"Expected ~1.36 kWh/h, got {result['overall']:.3f} kWh/h"
     
     @pytest.mark.asyncio
-    async def test_baseline_exclude_battery_grid(self, coordinator, mock_hass, fixtures_path):
+    async def test_baseline_exclude_battery_grid(self, coordinator, mock_hass, sample_states, history_executor):
         """Test baseline with battery grid charging excluded (not solar)."""
-        # Load sample data
-        house_states = load_csv_states(fixtures_path / "historic_total_house_energy_consumption.csv")
-        batt_states = load_csv_states(fixtures_path / "historic_total_charged_energy_to_batteries.csv")
-        pv_states = load_csv_states(fixtures_path / "historic_total_energy_from_pv.csv")
+        # Sample data (loaded once per module)
+        house_states = sample_states["house"]
+        batt_states = sample_states["batt"]
+        pv_states = sample_states["pv"]
         
         # Enable battery grid exclusion only
         mock_hass.data["energy_dispatcher"]["test_entry"]["config"]["runtime_exclude_ev"] = False
@@ -166,7 +181,7 @@ class TestBaselineWithSampleData:
         }
         
         with patch('homeassistant.components.recorder.history'):
-            mock_hass.async_add_executor_job = AsyncMock(return_value=history_data)
+            mock_hass.async_add_executor_job = history_executor(history_data)
             
             result = await coordinator._calculate_48h_baseline()
             
@@ -180,13 +195,13 @@ class TestBaselineWithSampleData:
             assert result["overall"] > 1.05, "Should not be excluding all battery charging, only grid charging"
     
     @pytest.mark.asyncio
-    async def test_baseline_exclude_ev_and_battery_grid(self, coordinator, mock_hass, fixtures_path):
+    async def test_baseline_exclude_ev_and_battery_grid(self, coordinator, mock_hass, sample_states, history_executor):
         """Test baseline with both EV and battery grid charging excluded."""
-        # Load sample data
-        house_states = load_csv_states(fixtures_path / "historic_total_house_energy_consumption.csv")
-        ev_states = load_csv_states(fixtures_path / "historic_EV_total_charged_energy.csv")
-        batt_states = load_csv_states(fixtures_path / "historic_total_charged_energy_to_batteries.csv")
-        pv_states = load_csv_states(fixtures_path / "historic_total_energy_from_pv.csv")
+        # Sample data (loaded once per module)
+        house_states = sample_states["house"]
+        ev_states = sample_states["ev"]
+        batt_states = sample_states["batt"]
+        pv_states = sample_states["pv"]
         
         # Enable both exclusions
         mock_hass.data["energy_dispatcher"]["test_entry"]["config"]["runtime_exclude_ev"] = True
@@ -200,7 +215,7 @@ class TestBaselineWithSampleData:
         }
         
         with patch('homeassistant.components.recorder.history'):
-            mock_hass.async_add_executor_job = AsyncMock(return_value=history_data)
+            mock_hass.async_add_executor_job = history_executor(history_data)
             
             result = await coordinator._calculate_48h_baseline()
             
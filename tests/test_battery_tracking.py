@@ -1,48 +1,67 @@
 """Unit tests for battery charge/discharge tracking in coordinator."""
 import pytest
+from collections import namedtuple
 from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+
+from homeassistant.util import dt as dt_util
 
 from custom_components.energy_dispatcher.coordinator import EnergyDispatcherCoordinator
 from custom_components.energy_dispatcher.bec import BatteryEnergyCost
 
 
-@pytest.fixture
+# Minimal immutable stand-in for a HA State; tracking only reads .state
+FakeState = namedtuple("FakeState", "state")
+
+
+class FakeStates(dict):
+    """Dict-backed stand-in for hass.states; dict.get returns None for unknown ids."""
+
+
+TRACKING_CONFIG = {
+    "batt_energy_charged_today_entity": "sensor.battery_charged_today",
+    "batt_energy_discharged_today_entity": "sensor.battery_discharged_today",
+    "pv_power_entity": "sensor.pv_power",
+    "pv_energy_today_entity": "sensor.pv_energy_today",
+    "load_power_entity": "sensor.load_power",
+    "batt_power_entity": "sensor.battery_power",
+    "runtime_counter_entity": "sensor.house_energy_total",
+    "grid_import_today_entity": "sensor.grid_import_today",
+}
+
+
+@pytest.fixture(scope="module")
 def mock_hass():
-    """Create a mock Home Assistant instance."""
+    """Create a mock Home Assistant instance (shared by the module)."""
     hass = MagicMock()
     hass.data = {}
     hass.states = MagicMock()
     return hass
 
 
-@pytest.fixture
+class UnsavedBEC(BatteryEnergyCost):
+    """BatteryEnergyCost whose async_save is a mock (slotted instances can't be stubbed)."""
+
+    __slots__ = ()
+    async_save = AsyncMock()
+
+
+@pytest.fixture(scope="module")
 def mock_bec(mock_hass):
-    """Create a mock BEC instance."""
-    bec = BatteryEnergyCost(mock_hass, capacity_kwh=30.0)
-    bec.async_save = AsyncMock()
-    return bec
+    """Create a mock BEC instance (shared by the module)."""
+    return UnsavedBEC(mock_hass, capacity_kwh=30.0)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def coordinator(mock_hass, mock_bec):
-    """Create a coordinator instance with mocked dependencies."""
+    """Create a coordinator instance with mocked dependencies (shared by the module)."""
     coordinator = EnergyDispatcherCoordinator(mock_hass)
     coordinator.entry_id = "test_entry"
     
     # Mock the store
     mock_hass.data["energy_dispatcher"] = {
         "test_entry": {
-            "config": {
-                "batt_energy_charged_today_entity": "sensor.battery_charged_today",
-                "batt_energy_discharged_today_entity": "sensor.battery_discharged_today",
-                "pv_power_entity": "sensor.pv_power",
-                "pv_energy_today_entity": "sensor.pv_energy_today",
-                "load_power_entity": "sensor.load_power",
-                "batt_power_entity": "sensor.battery_power",
-                "runtime_counter_entity": "sensor.house_energy_total",
-                "grid_import_today_entity": "sensor.grid_import_today",
-            },
+            "config": dict(TRACKING_CONFIG),
             "bec": mock_bec,
         }
     }
@@ -50,10 +69,39 @@ def coordinator(mock_hass, mock_bec):
     return coordinator
 
 
+@pytest.fixture(autouse=True)
+def _reset(coordinator, mock_hass, mock_bec):
+    """Reset the shared coordinator, hass and BEC to a clean state before each test."""
+    mock_hass.data["energy_dispatcher"]["test_entry"]["config"] = dict(TRACKING_CONFIG)
+    mock_hass.states = MagicMock()
+    coordinator.data = {}
+    coordinator.refresh_config_cache()
+    coordinator._tick_floats = None
+    coordinator._batt_prev_charged_today = None
+    coordinator._batt_prev_discharged_today = None
+    coordinator._batt_last_reset_date = None
+    coordinator._batt_last_update_time = None
+    coordinator._prev_pv_energy_today = None
+    coordinator._prev_house_energy = None
+    coordinator._prev_grid_import_today = None
+    mock_bec.energy_kwh = 0.0
+    mock_bec.wace = 0.0
+    mock_bec._replace_history(())
+    mock_bec._dirty = False
+    mock_bec.async_save.reset_mock()
+
+
+@pytest.fixture
+def stub_read_watts(coordinator):
+    """Make coordinator._read_watts return a constant 1000 W for one test."""
+    coordinator._read_watts = lambda *args, **kwargs: 1000.0
+    yield
+    del coordinator._read_watts  # Fall back to the class method
+
+
 class TestBatteryChargeTracking:
     """Test battery charge tracking functionality."""
 
-    @pytest.mark.asyncio
     async def test_charge_from_grid(self, coordinator, mock_bec):
         """Test tracking battery charging from grid using energy deltas."""
         # Setup initial state
@@ -65,25 +113,17 @@ class TestBatteryChargeTracking:
         # Mock current state showing 0.5 kWh more charged
         # PV increased by 0.2 kWh, grid import increased by 0.4 kWh
         # Battery charged 0.5 kWh - more than PV delta, so from grid
-        def state_get(entity_id):
-            mock_state = MagicMock()
-            if "charged_today" in entity_id:
-                mock_state.state = "10.5"
-            elif "pv_energy_today" in entity_id:
-                mock_state.state = "5.2"  # PV delta = 0.2 kWh
-            elif "grid_import_today" in entity_id:
-                mock_state.state = "2.4"  # Grid import delta = 0.4 kWh
-            else:
-                return None
-            return mock_state
-        
-        coordinator.hass.states.get = MagicMock(side_effect=state_get)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+            "sensor.pv_energy_today": FakeState("5.2"),  # PV delta = 0.2 kWh
+            "sensor.grid_import_today": FakeState("2.4"),  # Grid import delta = 0.4 kWh
+        })
         
         # Mock current price
         coordinator.data["current_enriched"] = 2.5
         
         # Mock the on_charge method to verify call
-        with patch.object(mock_bec, 'on_charge') as mock_on_charge:
+        with patch.object(BatteryEnergyCost, 'on_charge') as mock_on_charge:
             # Run tracking
             await coordinator._update_battery_charge_tracking()
             
@@ -97,7 +137,6 @@ class TestBatteryChargeTracking:
         # Verify charge was recorded and value updated
         assert coordinator._batt_prev_charged_today == 10.5
 
-    @pytest.mark.asyncio
     async def test_charge_from_solar(self, coordinator, mock_bec):
         """Test tracking battery charging from solar using energy deltas."""
         # Setup initial state
@@ -109,25 +148,17 @@ class TestBatteryChargeTracking:
         # Mock current state showing 0.5 kWh more charged
         # PV increased by 0.6 kWh, no grid import increase
         # Battery charged 0.5 kWh - less than PV delta, so from solar
-        def state_get(entity_id):
-            mock_state = MagicMock()
-            if "charged_today" in entity_id:
-                mock_state.state = "10.5"
-            elif "pv_energy_today" in entity_id:
-                mock_state.state = "5.6"  # PV delta = 0.6 kWh (> 0.5 * 0.95)
-            elif "grid_import_today" in entity_id:
-                mock_state.state = "2.0"  # No grid import
-            else:
-                return None
-            return mock_state
-        
-        coordinator.hass.states.get = MagicMock(side_effect=state_get)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+            "sensor.pv_energy_today": FakeState("5.6"),  # PV delta = 0.6 kWh (> 0.5 * 0.95)
+            "sensor.grid_import_today": FakeState("2.0"),  # No grid import
+        })
         
         # Mock current price
         coordinator.data["current_enriched"] = 2.5
         
         # Mock the on_charge method to verify call
-        with patch.object(mock_bec, 'on_charge') as mock_on_charge:
+        with patch.object(BatteryEnergyCost, 'on_charge') as mock_on_charge:
             # Run tracking
             await coordinator._update_battery_charge_tracking()
             
@@ -141,7 +172,6 @@ class TestBatteryChargeTracking:
         # Verify charge was recorded and value updated
         assert coordinator._batt_prev_charged_today == 10.5
 
-    @pytest.mark.asyncio
     async def test_discharge_tracking(self, coordinator, mock_bec):
         """Test tracking battery discharge."""
         # Setup initial state
@@ -149,9 +179,9 @@ class TestBatteryChargeTracking:
         coordinator._batt_prev_discharged_today = 5.0
         
         # Mock current state showing 0.3 kWh more discharged
-        mock_state = MagicMock()
-        mock_state.state = "5.3"
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_discharged_today": FakeState("5.3"),
+        })
         
         # Run tracking
         await coordinator._update_battery_charge_tracking()
@@ -159,7 +189,6 @@ class TestBatteryChargeTracking:
         # Verify discharge was recorded
         assert coordinator._batt_prev_discharged_today == 5.3
 
-    @pytest.mark.asyncio
     async def test_daily_reset(self, coordinator, mock_bec):
         """Test that tracking resets on new day."""
         # Setup state from previous day
@@ -170,9 +199,10 @@ class TestBatteryChargeTracking:
         coordinator._batt_prev_discharged_today = 5.0
         
         # Mock current state
-        mock_state = MagicMock()
-        mock_state.state = "1.0"  # New day, counter reset
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("1.0"),  # New day, counter reset
+            "sensor.battery_discharged_today": FakeState("1.0"),
+        })
         
         # Run tracking
         await coordinator._update_battery_charge_tracking()
@@ -182,7 +212,21 @@ class TestBatteryChargeTracking:
         assert coordinator._batt_prev_charged_today == 1.0
         # Should not trigger charge event since it's first reading of the day
 
-    @pytest.mark.asyncio
+    async def test_data_gap_restarts_tracking(self, coordinator, mock_bec):
+        """Test that a > 1 hour data gap stores new readings without recording a charge."""
+        coordinator._batt_last_reset_date = dt_util.now().date()
+        coordinator._batt_last_update_time = dt_util.now() - timedelta(hours=2)
+        coordinator._batt_prev_charged_today = 10.0
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("12.0"),
+        })
+        
+        await coordinator._update_battery_charge_tracking()
+        
+        assert not mock_bec.charge_history
+        assert coordinator._batt_prev_charged_today == 12.0
+        assert coordinator._batt_last_update_time is not None
+
     async def test_no_entities_configured(self, coordinator, mock_bec):
         """Test that tracking doesn't fail when no entities are configured."""
         # Clear configured entities
@@ -194,7 +238,6 @@ class TestBatteryChargeTracking:
         # Verify no tracking occurred
         assert coordinator._batt_prev_charged_today is None
 
-    @pytest.mark.asyncio
     async def test_unavailable_sensor(self, coordinator, mock_bec):
         """Test handling of unavailable sensors."""
         # Setup initial state
@@ -202,9 +245,10 @@ class TestBatteryChargeTracking:
         coordinator._batt_prev_charged_today = 10.0
         
         # Mock unavailable sensor
-        mock_state = MagicMock()
-        mock_state.state = "unavailable"
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("unavailable"),
+            "sensor.battery_discharged_today": FakeState("unavailable"),
+        })
         
         # Run tracking - should not raise exception
         await coordinator._update_battery_charge_tracking()
@@ -212,7 +256,6 @@ class TestBatteryChargeTracking:
         # Verify tracking state didn't change
         assert coordinator._batt_prev_charged_today == 10.0
 
-    @pytest.mark.asyncio
     async def test_small_delta_ignored(self, coordinator, mock_bec):
         """Test that very small deltas are ignored."""
         # Setup initial state
@@ -220,17 +263,18 @@ class TestBatteryChargeTracking:
         coordinator._batt_prev_charged_today = 10.0
         
         # Mock current state with tiny change (< 1 Wh)
-        mock_state = MagicMock()
-        mock_state.state = "10.0005"  # 0.5 Wh change
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.0005"),  # 0.5 Wh change
+        })
         
         # Run tracking
         await coordinator._update_battery_charge_tracking()
         
         # Verify small change was updated but didn't trigger charge event
         assert coordinator._batt_prev_charged_today == 10.0005
+        assert not mock_bec.charge_history
+        mock_bec.async_save.assert_not_called()
 
-    @pytest.mark.asyncio
     async def test_charge_without_pv_energy_sensor_grid(self, coordinator, mock_bec):
         """Test battery charge tracking without PV energy sensor - defaults to grid."""
         # Setup initial state
@@ -241,21 +285,15 @@ class TestBatteryChargeTracking:
         coordinator.hass.data["energy_dispatcher"]["test_entry"]["config"]["pv_energy_today_entity"] = ""
         
         # Mock current state showing 0.5 kWh more charged
-        def state_get(entity_id):
-            mock_state = MagicMock()
-            if "charged_today" in entity_id:
-                mock_state.state = "10.5"
-            else:
-                return None
-            return mock_state
-        
-        coordinator.hass.states.get = MagicMock(side_effect=state_get)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+        })
         
         # Mock current price
         coordinator.data["current_enriched"] = 2.5
         
         # Mock the on_charge method to verify call
-        with patch.object(mock_bec, 'on_charge') as mock_on_charge:
+        with patch.object(BatteryEnergyCost, 'on_charge') as mock_on_charge:
             # Run tracking - without PV energy sensor, defaults to grid
             await coordinator._update_battery_charge_tracking()
             
@@ -266,7 +304,6 @@ class TestBatteryChargeTracking:
             assert call_args[1] == 2.5  # cost (grid price, not 0.0)
             assert call_args[2] == "grid"  # source
 
-    @pytest.mark.asyncio
     async def test_charge_with_insufficient_pv_grid(self, coordinator, mock_bec):
         """Test battery charge tracking when PV delta is less than battery charge - grid charging."""
         # Setup initial state
@@ -276,23 +313,16 @@ class TestBatteryChargeTracking:
         
         # Mock current state showing 0.5 kWh more charged
         # But PV only increased by 0.3 kWh (not enough to cover battery charge)
-        def state_get(entity_id):
-            mock_state = MagicMock()
-            if "charged_today" in entity_id:
-                mock_state.state = "10.5"
-            elif "pv_energy_today" in entity_id:
-                mock_state.state = "5.3"  # PV delta = 0.3 kWh (< 0.5 * 0.95)
-            else:
-                return None
-            return mock_state
-        
-        coordinator.hass.states.get = MagicMock(side_effect=state_get)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+            "sensor.pv_energy_today": FakeState("5.3"),  # PV delta = 0.3 kWh (< 0.5 * 0.95)
+        })
         
         # Mock current price
         coordinator.data["current_enriched"] = 2.5
         
         # Mock the on_charge method to verify call
-        with patch.object(mock_bec, 'on_charge') as mock_on_charge:
+        with patch.object(BatteryEnergyCost, 'on_charge') as mock_on_charge:
             # Run tracking
             await coordinator._update_battery_charge_tracking()
             
@@ -304,25 +334,38 @@ class TestBatteryChargeTracking:
             assert call_args[2] == "grid"  # source
 
 
+    async def test_charge_saved_on_flush(self, coordinator, mock_bec):
+        """Test that charge events are persisted by the periodic flush, not per tick."""
+        coordinator._batt_last_reset_date = date.today()
+        coordinator._batt_prev_charged_today = 10.0
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+        })
+        
+        await coordinator._update_battery_charge_tracking()
+        assert len(mock_bec.charge_history) == 1
+        mock_bec.async_save.assert_not_called()
+        
+        await coordinator._async_flush_bec()
+        mock_bec.async_save.assert_called_once()
+
+
 class TestBatteryCapacitySensor:
     """Test battery capacity from sensor."""
 
     def test_capacity_from_sensor(self, mock_hass):
         """Test that capacity can be read from sensor."""
         # Mock sensor state
-        mock_state = MagicMock()
-        mock_state.state = "30.0"
-        mock_hass.states.get = MagicMock(return_value=mock_state)
+        mock_hass.states = FakeStates({"sensor.battery_capacity": FakeState("30.0")})
         
         # This would be tested in integration test, but verifies the concept
-        assert float(mock_state.state) == 30.0
+        assert float(mock_hass.states.get("sensor.battery_capacity").state) == 30.0
 
 
 class TestBatteryPowerSignInversion:
     """Test battery power sign inversion feature."""
 
-    @pytest.mark.asyncio
-    async def test_charge_with_inverted_sign(self, coordinator, mock_bec):
+    async def test_charge_with_inverted_sign(self, coordinator, mock_bec, stub_read_watts):
         """Test tracking battery charging with inverted sign (Huawei convention)."""
         # Enable sign inversion
         coordinator.hass.data["energy_dispatcher"]["test_entry"]["config"]["batt_power_invert_sign"] = True
@@ -332,31 +375,19 @@ class TestBatteryPowerSignInversion:
         coordinator._batt_prev_charged_today = 10.0
         
         # Mock current state showing 0.5 kWh more charged
-        mock_charged_state = MagicMock()
-        mock_charged_state.state = "10.5"
-        
         # Mock battery power (negative = charging in Huawei convention)
         # With inversion enabled, this should be correctly interpreted as charging
-        mock_batt_power = MagicMock()
-        mock_batt_power.state = "-4000"  # Negative in Huawei = charging
-        
-        def state_get(entity_id):
-            if "charged_today" in entity_id:
-                return mock_charged_state
-            elif "battery_power" in entity_id:
-                return mock_batt_power
-            return None
-        
-        coordinator.hass.states.get = MagicMock(side_effect=state_get)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_charged_today": FakeState("10.5"),
+            "sensor.battery_power": FakeState("-4000"),  # Negative in Huawei = charging
+        })
         
         # Mock current price and PV
         coordinator.data["current_enriched"] = 2.5
         coordinator.data["pv_now_w"] = 5000.0  # 5kW PV output
         
-        # Mock load power
-        with patch.object(coordinator, '_read_watts', return_value=1000.0):
-            # Run tracking
-            await coordinator._update_battery_charge_tracking()
+        # Run tracking (load power stubbed to 1000 W)
+        await coordinator._update_battery_charge_tracking()
         
         # Verify charge was recorded and value updated
         assert coordinator._batt_prev_charged_today == 10.5
@@ -364,9 +395,9 @@ class TestBatteryPowerSignInversion:
     def test_normalized_battery_power_standard(self, coordinator):
         """Test that normalized battery power works with standard convention."""
         # Standard convention (default): positive = charging
-        mock_state = MagicMock()
-        mock_state.state = "1000"  # Charging at 1000W
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_power": FakeState("1000"),  # Charging at 1000W
+        })
         
         power = coordinator._read_battery_power_normalized()
         assert power == 1000.0  # No inversion
@@ -377,9 +408,39 @@ class TestBatteryPowerSignInversion:
         coordinator.hass.data["energy_dispatcher"]["test_entry"]["config"]["batt_power_invert_sign"] = True
         
         # Huawei convention: negative = charging
-        mock_state = MagicMock()
-        mock_state.state = "-1000"  # Charging at 1000W (Huawei convention)
-        coordinator.hass.states.get = MagicMock(return_value=mock_state)
+        coordinator.hass.states = FakeStates({
+            "sensor.battery_power": FakeState("-1000"),  # Charging at 1000W (Huawei convention)
+        })
         
         power = coordinator._read_battery_power_normalized()
         assert power == 1000.0  # Inverted to standard convention
+
+    def test_config_cached_until_refresh(self, coordinator):
+        """Test that sign convention is cached until refresh_config_cache()."""
+        coordinator.hass.states = FakeStates({"sensor.battery_power": FakeState("-1000")})
+        
+        assert coordinator._read_battery_power_normalized() == -1000.0
+        
+        # Options change is only picked up after the cache is refreshed
+        coordinator.hass.data["energy_dispatcher"]["test_entry"]["config"]["batt_power_invert_sign"] = True
+        assert coordinator._read_battery_power_normalized() == -1000.0
+        
+        coordinator.refresh_config_cache()
+        assert coordinator._read_battery_power_normalized() == 1000.0
+
+
+class TestTickStateCache:
+    """Test per-refresh parsing cache for sensor values."""
+
+    def test_float_state_cached_within_refresh(self, coordinator):
+        """Test that a value is parsed once per refresh and re-read outside it."""
+        coordinator.hass.states = FakeStates({"sensor.battery_charged_today": FakeState("10.5")})
+        coordinator._tick_floats = {}
+        assert coordinator._float_state("sensor.battery_charged_today") == 10.5
+        
+        coordinator.hass.states["sensor.battery_charged_today"] = FakeState("11.0")
+        assert coordinator._float_state("sensor.battery_charged_today") == 10.5
+        
+        # Outside a refresh values are always read fresh
+        coordinator._tick_floats = None
+        assert coordinator._float_state("sensor.battery_charged_today") == 11.0
@@ -1,15 +1,20 @@
 """Unit tests for Battery Energy Cost (BEC) module."""
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
-from custom_components.energy_dispatcher.bec import BatteryEnergyCost
+import orjson
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
 
+from custom_components.energy_dispatcher.bec import BatteryEnergyCost, _replay_history
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
 def mock_hass():
-    """Create a mock Home Assistant instance."""
-    hass = MagicMock()
-    return hass
+    """Create a stub Home Assistant instance (shared; BEC only keeps a reference)."""
+    return SimpleNamespace(data={}, config=None)
 
 
 @pytest.fixture
@@ -38,6 +43,22 @@ class TestInitialization:
         with pytest.raises(ValueError, match="must be positive"):
             BatteryEnergyCost(mock_hass, capacity_kwh=-5.0)
 
+    def test_state_lives_in_slots(self, bec):
+        """Test that tracker state is slotted and instances have no __dict__."""
+        bec.on_charge(5.0, 2.0)
+        bec.on_discharge(1.0)
+        bec.reset_cost()
+        bec.get_history_summary()
+        assert not hasattr(bec, "__dict__")
+
+    def test_instances_have_no_dict(self, mock_hass):
+        """Test that __dict__ is not slotted back in and unknown attributes are rejected."""
+        assert "__dict__" not in BatteryEnergyCost.__slots__
+        bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
+        assert not hasattr(bec, "__dict__")
+        with pytest.raises(AttributeError):
+            bec.unslotted = 1.0
+
 
 class TestSOCSetting:
     """Test manual SOC setting functionality."""
@@ -78,93 +99,76 @@ class TestSOCSetting:
         bec.set_soc(50.0)
         assert bec.wace == 2.5  # WACE unchanged
 
+    def test_set_soc_full_is_exact(self, mock_hass):
+        """Test that 100% SOC maps to exactly the capacity and back."""
+        for capacity in (4.1, 13.7, 15.0):
+            bec = BatteryEnergyCost(mock_hass, capacity_kwh=capacity)
+            bec.set_soc(100.0)
+            assert bec.energy_kwh == capacity
+            assert bec.get_soc() == 100.0
+
 
 class TestCharging:
     """Test battery charging functionality."""
 
-    def test_charge_from_empty(self, bec):
-        """Test charging from empty battery."""
-        bec.on_charge(5.0, 2.0)  # 5 kWh at 2 SEK/kWh
-        assert bec.energy_kwh == 5.0
-        assert bec.wace == 2.0
-
-    def test_charge_multiple_events_same_cost(self, bec):
-        """Test multiple charging events at same cost."""
-        bec.on_charge(5.0, 2.0)
-        bec.on_charge(5.0, 2.0)
-        assert bec.energy_kwh == 10.0
-        assert bec.wace == 2.0
-
-    def test_charge_multiple_events_different_cost(self, bec):
-        """Test multiple charging events at different costs."""
-        bec.on_charge(5.0, 1.0)  # 5 kWh @ 1 SEK/kWh = 5 SEK
-        bec.on_charge(5.0, 3.0)  # 5 kWh @ 3 SEK/kWh = 15 SEK
-        # Total: 10 kWh, 20 SEK -> WACE = 2.0 SEK/kWh
-        assert bec.energy_kwh == 10.0
-        assert bec.wace == pytest.approx(2.0)
-
-    def test_charge_weighted_average(self, bec):
-        """Test weighted average calculation."""
-        bec.on_charge(3.0, 1.5)  # 3 kWh @ 1.5 SEK/kWh = 4.5 SEK
-        bec.on_charge(7.0, 2.5)  # 7 kWh @ 2.5 SEK/kWh = 17.5 SEK
-        # Total: 10 kWh, 22 SEK -> WACE = 2.2 SEK/kWh
-        assert bec.energy_kwh == 10.0
-        assert bec.wace == pytest.approx(2.2)
-
-    def test_charge_exceeds_capacity(self, bec):
-        """Test charging beyond battery capacity."""
-        bec.on_charge(20.0, 2.0)  # More than 15 kWh capacity
-        assert bec.energy_kwh == 15.0  # Capped at capacity
-
-    def test_charge_zero_delta(self, bec):
-        """Test charging with zero delta is ignored."""
-        bec.on_charge(0.0, 2.0)
-        assert bec.energy_kwh == 0.0
-        assert bec.wace == 0.0
-
-    def test_charge_negative_delta(self, bec):
-        """Test charging with negative delta is ignored."""
-        bec.on_charge(-5.0, 2.0)
-        assert bec.energy_kwh == 0.0
-        assert bec.wace == 0.0
+    @pytest.mark.parametrize(
+        "charges,expected_energy,expected_wace",
+        [
+            # 5 kWh at 2 SEK/kWh
+            ([(5.0, 2.0)], 5.0, 2.0),
+            ([(5.0, 2.0), (5.0, 2.0)], 10.0, 2.0),
+            # 5 SEK + 15 SEK over 10 kWh -> 2.0 SEK/kWh
+            ([(5.0, 1.0), (5.0, 3.0)], 10.0, 2.0),
+            # 4.5 SEK + 17.5 SEK over 10 kWh -> 2.2 SEK/kWh
+            ([(3.0, 1.5), (7.0, 2.5)], 10.0, 2.2),
+            # Capped at the 15 kWh capacity; the cost of all 20 kWh is
+            # spread over the capped energy
+            ([(20.0, 2.0)], 15.0, 40.0 / 15.0),
+            # Non-positive deltas are ignored
+            ([(0.0, 2.0)], 0.0, 0.0),
+            ([(-5.0, 2.0)], 0.0, 0.0),
+        ],
+        ids=[
+            "from_empty",
+            "same_cost",
+            "different_cost",
+            "weighted_average",
+            "exceeds_capacity",
+            "zero_delta",
+            "negative_delta",
+        ],
+    )
+    def test_charge(self, bec, charges, expected_energy, expected_wace):
+        """Test energy and WACE after a sequence of charging events."""
+        for delta_kwh, cost in charges:
+            bec.on_charge(delta_kwh, cost)
+        assert bec.energy_kwh == expected_energy
+        assert bec.wace == pytest.approx(expected_wace)
 
 
 class TestDischarging:
     """Test battery discharging functionality."""
 
-    def test_discharge_partial(self, bec):
-        """Test partial discharge."""
-        bec.on_charge(10.0, 2.0)
-        bec.on_discharge(3.0)
-        assert bec.energy_kwh == 7.0
-        assert bec.wace == 2.0  # WACE unchanged
-
-    def test_discharge_full(self, bec):
-        """Test complete discharge."""
-        bec.on_charge(10.0, 2.0)
-        bec.on_discharge(10.0)
-        assert bec.energy_kwh == 0.0
-        assert bec.wace == 2.0  # WACE preserved
-
-    def test_discharge_more_than_available(self, bec):
-        """Test discharging more than available energy."""
-        bec.on_charge(5.0, 2.0)
-        bec.on_discharge(10.0)
-        assert bec.energy_kwh == 0.0  # Cannot go negative
+    @pytest.mark.parametrize(
+        "charged_kwh,discharged_kwh,expected_energy",
+        [
+            (10.0, 3.0, 7.0),
+            (10.0, 10.0, 0.0),
+            # Cannot go negative
+            (5.0, 10.0, 0.0),
+            # Non-positive deltas are ignored
+            (10.0, 0.0, 10.0),
+            (10.0, -5.0, 10.0),
+        ],
+        ids=["partial", "full", "more_than_available", "zero_delta", "negative_delta"],
+    )
+    def test_discharge(self, bec, charged_kwh, discharged_kwh, expected_energy):
+        """Test that discharging reduces energy and preserves the WACE."""
+        bec.on_charge(charged_kwh, 2.0)
+        bec.on_discharge(discharged_kwh)
+        assert bec.energy_kwh == expected_energy
         assert bec.wace == 2.0
 
-    def test_discharge_zero_delta(self, bec):
-        """Test discharging with zero delta is ignored."""
-        bec.on_charge(10.0, 2.0)
-        bec.on_discharge(0.0)
-        assert bec.energy_kwh == 10.0
-
-    def test_discharge_negative_delta(self, bec):
-        """Test discharging with negative delta is ignored."""
-        bec.on_charge(10.0, 2.0)
-        bec.on_discharge(-5.0)
-        assert bec.energy_kwh == 10.0
-
 
 class TestCostReset:
     """Test manual cost reset functionality."""
@@ -219,6 +223,18 @@ class TestGetters:
 class TestPersistence:
     """Test persistence functionality."""
 
+    @pytest.mark.asyncio
+    async def test_save_payload_is_json_native(self, bec):
+        """Test that the saved payload encodes with HA's orjson encoder as-is."""
+        bec.on_charge(5.0, 2.0)
+        bec.on_discharge(1.0)
+        bec.store.async_save = AsyncMock()
+        
+        await bec.async_save()
+        
+        payload = bec.store.async_save.call_args[0][0]
+        assert orjson.loads(orjson.dumps(payload)) == payload
+
     @pytest.mark.asyncio
     async def test_save_and_load(self, bec):
         """Test saving and loading state."""
@@ -268,7 +284,7 @@ class TestPersistence:
     async def test_save_error_handling(self, bec):
         """Test error handling during save."""
         async def mock_save_error(data):
-            raise Exception("Storage error")
+            raise OSError("Storage error")
             
         bec.store.async_save = mock_save_error
         result = await bec.async_save()
@@ -278,12 +294,63 @@ class TestPersistence:
     async def test_load_error_handling(self, bec):
         """Test error handling during load."""
         async def mock_load_error():
-            raise Exception("Storage error")
+            raise HomeAssistantError("Storage error")
             
         bec.store.async_load = mock_load_error
         result = await bec.async_load()
         assert result is False
 
+    @pytest.mark.asyncio
+    async def test_load_malformed_data(self, bec):
+        """Test that malformed persisted data leaves the current state untouched."""
+        bec.on_charge(5.0, 2.0)
+        bec.store.async_load = AsyncMock(
+            return_value={"energy_kwh": "abc", "wace": 1.0, "charge_history": []}
+        )
+        
+        result = await bec.async_load()
+        assert result is False
+        assert bec.energy_kwh == 5.0
+        assert bec.wace == 2.0
+        assert len(bec.charge_history) == 1
+
+    @pytest.mark.asyncio
+    async def test_load_malformed_history(self, bec):
+        """Test that a malformed history is dropped but the state is kept."""
+        bec.store.async_load = AsyncMock(
+            return_value={"energy_kwh": 5.0, "wace": 1.0, "charge_history": [None]}
+        )
+        
+        assert await bec.async_load() is True
+        assert bec.energy_kwh == 5.0
+        assert bec.wace == 1.0
+        assert len(bec.charge_history) == 1
+        assert bec.charge_history[0]["event_type"] == "initial"
+
+    @pytest.mark.asyncio
+    async def test_unexpected_save_error_propagates(self, bec):
+        """Test that programming errors are not swallowed as storage failures."""
+        bec.store.async_save = AsyncMock(side_effect=RuntimeError("bug"))
+        with pytest.raises(RuntimeError):
+            await bec.async_save()
+
+    @pytest.mark.asyncio
+    async def test_save_if_dirty(self, bec):
+        """Test that only recorded charge/discharge events trigger a save."""
+        bec.store.async_save = AsyncMock()
+        
+        assert await bec.async_save_if_dirty() is False
+        bec.store.async_save.assert_not_called()
+        
+        bec.on_charge(2.0, 1.0)
+        bec.on_discharge(1.0)
+        assert await bec.async_save_if_dirty() is True
+        bec.store.async_save.assert_called_once()
+        
+        # Clean after a successful save
+        assert await bec.async_save_if_dirty() is False
+        bec.store.async_save.assert_called_once()
+
 
 class TestComplexScenarios:
     """Test complex real-world scenarios."""
@@ -398,6 +465,17 @@ class TestHistoricalData:
         all_events = bec.get_charge_history()
         assert len(all_events) == 10
 
+    def test_history_timestamp_is_local_iso(self, bec):
+        """Test that event timestamps are local-time ISO strings."""
+        before = dt_util.now()
+        bec.on_charge(1.0, 1.0)
+        bec.on_discharge(0.5)
+        after = dt_util.now()
+        
+        for event in bec.get_charge_history():
+            timestamp = datetime.fromisoformat(event["timestamp"])
+            assert before - timedelta(seconds=1) <= timestamp <= after
+
     def test_history_max_30_days(self, bec):
         """Test that history is limited to 30 days (2880 15-min intervals)."""
         # Add more than 30 days of data
@@ -441,6 +519,43 @@ class TestHistoricalData:
         # (5*0 + 5*3) / 10 = 15/10 = 1.5
         assert bec.wace == pytest.approx(1.5)
 
+    def test_recalculate_reuses_replay_until_history_changes(self, bec):
+        """Test that repeated recalculation reuses the replay result."""
+        bec.on_charge(5.0, 2.0)
+        bec.on_charge(5.0, 4.0)
+        assert bec.recalculate_wace_from_history() is True
+        
+        bec.set_soc(20.0)
+        with patch("custom_components.energy_dispatcher.bec._replay_history") as replay:
+            assert bec.recalculate_wace_from_history() is True
+            replay.assert_not_called()
+        # The memoized result is still applied over the manual override
+        assert bec.energy_kwh == pytest.approx(10.0)
+        assert bec.wace == pytest.approx(3.0)
+        
+        bec.on_charge(5.0, 3.0)
+        bec.wace = 0.0
+        assert bec.recalculate_wace_from_history() is True
+        assert bec.energy_kwh == pytest.approx(15.0)
+        assert bec.wace == pytest.approx(3.0)
+
+    def test_replay_history_weights_remaining_energy(self):
+        """Test that the replay weights new charges against the energy left."""
+        events = [
+            {"event_type": "charge", "energy_kwh": 10.0, "cost_sek_per_kwh": 1.0},
+            {"event_type": "discharge", "energy_kwh": -8.0},
+            {"event_type": "charge", "energy_kwh": 2.0, "cost_sek_per_kwh": 3.0},
+            {"event_type": "discharge", "energy_kwh": -9.0},
+        ]
+        
+        energy, wace = _replay_history(events[:3])
+        # (2*1 + 2*3) / 4 = 2.0
+        assert energy == pytest.approx(4.0)
+        assert wace == pytest.approx(2.0)
+        
+        # Discharging below zero empties the battery but keeps the WACE
+        assert _replay_history(events) == (0.0, pytest.approx(2.0))
+
     def test_history_summary(self, bec):
         """Test getting summary statistics from history."""
         bec.on_charge(5.0, 2.0, source="grid")
@@ -456,6 +571,42 @@ class TestHistoricalData:
         assert summary["oldest_event"] is not None
         assert summary["newest_event"] is not None
 
+    def test_history_summary_cached_until_history_changes(self, bec):
+        """Test that the summary is rebuilt only after a new event."""
+        bec.on_charge(5.0, 2.0)
+        summary = bec.get_history_summary()
+        assert bec.get_history_summary() == summary
+        
+        bec.on_discharge(1.0)
+        updated = bec.get_history_summary()
+        assert updated["discharge_events"] == 1
+        assert summary["discharge_events"] == 0
+
+    def test_history_summary_mutation_does_not_leak(self, bec):
+        """Test that modifying a returned summary does not affect the next call."""
+        bec.on_charge(5.0, 2.0)
+        summary = bec.get_history_summary()
+        summary["total_charged_kwh"] = 99.0
+        summary["extra"] = "sensor attribute"
+        
+        again = bec.get_history_summary()
+        assert again["total_charged_kwh"] == 5.0
+        assert "extra" not in again
+
+    def test_history_summary_after_eviction(self, bec):
+        """Test that summary totals drop events evicted from the full history."""
+        bec.on_discharge(1.0)
+        for i in range(2880):
+            bec.on_charge(0.001, 1.0)
+        
+        summary = bec.get_history_summary()
+        assert summary["total_events"] == 2880
+        assert summary["charge_events"] == 2880
+        assert summary["discharge_events"] == 0
+        assert summary["total_discharged_kwh"] == 0.0
+        assert summary["total_charged_kwh"] == pytest.approx(2.88)
+        assert summary["avg_charge_cost"] == pytest.approx(1.0)
+
     def test_history_summary_empty(self, bec):
         """Test history summary when no events exist."""
         summary = bec.get_history_summary()
@@ -487,6 +638,7 @@ class TestHistoricalData:
         # Save
         await bec.async_save()
         assert "charge_history" in storage
+        assert isinstance(storage["charge_history"], list)
         assert len(storage["charge_history"]) == 2
         
         # Create new instance and load
@@ -498,6 +650,13 @@ class TestHistoricalData:
         assert len(new_bec.charge_history) == 2
         assert new_bec.charge_history[0]["energy_kwh"] == 5.0
         assert new_bec.charge_history[1]["energy_kwh"] == 3.0
+        assert new_bec.get_history_summary()["total_charged_kwh"] == 8.0
+        
+        # Labels decoded from storage are shared, not one string per record
+        decoded = orjson.loads(orjson.dumps(storage))
+        new_bec.store.async_load = AsyncMock(return_value=decoded)
+        await new_bec.async_load()
+        assert new_bec.charge_history[0]["event_type"] is new_bec.charge_history[1]["event_type"]
 
     @pytest.mark.asyncio
     async def test_migration_from_v1_to_v2(self, bec):
@@ -525,3 +684,10 @@ class TestHistoricalData:
         assert migration_event["source"] == "migration"
         assert migration_event["event_type"] == "initial"
         assert migration_event["energy_kwh"] == 10.0
+
+    @pytest.mark.asyncio
+    async def test_store_passes_v1_data_through(self, bec):
+        """Test that the Store hands version 1 data on instead of refusing it."""
+        old_data = {"energy_kwh": 10.0, "wace": 2.5}
+        migrated = await bec.store._async_migrate_func(1, 1, old_data)
+        assert migrated == old_data
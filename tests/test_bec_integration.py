@@ -1,38 +1,57 @@
 """Integration tests for BEC module with Home Assistant."""
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
 
 from custom_components.energy_dispatcher.bec import BatteryEnergyCost
 
 
-@pytest.fixture
+async def _noop_async(*args, **kwargs):
+    """Stand-in for service registration; no test inspects its calls."""
+    return None
+
+
+@pytest.fixture(scope="module")
 def mock_hass():
-    """Create a mock Home Assistant instance with services."""
-    hass = MagicMock()
-    hass.services = MagicMock()
-    hass.services.has_service = MagicMock(return_value=False)
-    hass.services.async_register = AsyncMock()
-    return hass
+    """Create a stub Home Assistant instance with services (shared by the module)."""
+    return SimpleNamespace(
+        data={},
+        config=None,
+        services=SimpleNamespace(
+            has_service=lambda *args: False,
+            async_register=_noop_async,
+        ),
+    )
+
+
+# In-memory stand-in for the BEC Store, emptied for each test by memory_store
+_STORAGE: dict = {}
+
+
+async def _save(data):
+    _STORAGE.update(data)
+
+
+async def _load():
+    return _STORAGE or None
+
+
+@pytest.fixture
+def memory_store():
+    """Return (async_save, async_load, backing dict) standing in for the BEC Store."""
+    _STORAGE.clear()
+    return _save, _load, _STORAGE
 
 
 class TestIntegrationScenarios:
     """Test real-world integration scenarios."""
 
-    @pytest.mark.asyncio
-    async def test_initialization_and_persistence(self, mock_hass):
+    async def test_initialization_and_persistence(self, mock_hass, memory_store):
         """Test that BEC initializes and persists correctly."""
         # Create BEC instance
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
         
         # Simulate storage
-        storage = {}
-        
-        async def mock_save(data):
-            storage.update(data)
-            
-        async def mock_load():
-            return storage if storage else None
-            
+        mock_save, mock_load, storage = memory_store
         bec.store.async_save = mock_save
         bec.store.async_load = mock_load
         
@@ -45,7 +64,7 @@ class TestIntegrationScenarios:
         
         # Verify storage
         assert storage["energy_kwh"] == 10.0
-        assert storage["wace"] == pytest.approx(2.5)
+        assert storage["wace"] == 2.5
         
         # Create new instance and load
         new_bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
@@ -54,11 +73,10 @@ class TestIntegrationScenarios:
         
         # Verify state was restored
         assert new_bec.energy_kwh == 10.0
-        assert new_bec.wace == pytest.approx(2.5)
-        assert new_bec.get_soc() == pytest.approx(66.67, rel=0.01)
+        assert new_bec.wace == 2.5
+        assert round(new_bec.get_soc(), 2) == 66.67
 
-    @pytest.mark.asyncio
-    async def test_service_call_reset_cost(self, mock_hass):
+    def test_service_call_reset_cost(self, mock_hass):
         """Test battery cost reset service behavior."""
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
         
@@ -74,8 +92,7 @@ class TestIntegrationScenarios:
         assert bec.wace == 0.0
         assert bec.energy_kwh == 10.0  # Energy preserved
 
-    @pytest.mark.asyncio
-    async def test_service_call_set_soc(self, mock_hass):
+    def test_service_call_set_soc(self, mock_hass):
         """Test manual SOC override service behavior."""
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
         
@@ -91,8 +108,7 @@ class TestIntegrationScenarios:
         assert bec.energy_kwh == 12.0
         assert bec.wace == original_wace  # Cost preserved
 
-    @pytest.mark.asyncio
-    async def test_sensor_data_flow(self, mock_hass):
+    def test_sensor_data_flow(self, mock_hass):
         """Test that sensor can read BEC data correctly."""
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
         
@@ -105,17 +121,10 @@ class TestIntegrationScenarios:
         assert bec.get_soc() == 50.0
         assert bec.get_total_cost() == 15.0  # 7.5 kWh * 2.0 SEK/kWh
 
-    @pytest.mark.asyncio
-    async def test_realistic_daily_cycle_with_persistence(self, mock_hass):
+    async def test_realistic_daily_cycle_with_persistence(self, mock_hass, memory_store):
         """Test a realistic daily cycle with saves."""
         # Simulate storage
-        storage = {}
-        
-        async def mock_save(data):
-            storage.update(data)
-            
-        async def mock_load():
-            return storage if storage else None
+        mock_save, mock_load, storage = memory_store
         
         # Morning: Start from previous day's state
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
@@ -129,35 +138,34 @@ class TestIntegrationScenarios:
         
         # Morning: Charge from grid (expensive)
         bec.on_charge(5.5, 3.0)  # Now at 66.67%
-        await bec.async_save()
         
         # Midday: Charge from solar (cheap)
         bec.on_charge(5.0, 0.5)  # Now at 100%
-        await bec.async_save()
         
         # Calculate expected WACE: (4.5*1.5 + 5.5*3.0 + 5.0*0.5) / 15 = 25.75 / 15 ≈ 1.7167
         assert bec.get_soc() == 100.0
-        assert bec.wace == pytest.approx(1.7167, rel=0.001)
+        assert round(bec.wace, 4) == 1.7167
         
         # Evening: Discharge
         bec.on_discharge(10.0)  # Down to 33.33%
-        await bec.async_save()
         
         # Verify final state
-        assert bec.get_soc() == pytest.approx(33.33, rel=0.01)
+        assert round(bec.get_soc(), 2) == 33.33
         assert bec.energy_kwh == 5.0
-        assert bec.wace == pytest.approx(1.7167, rel=0.001)  # WACE unchanged
+        assert round(bec.wace, 4) == 1.7167  # WACE unchanged
+        
+        # End of day: persist once and check what was written
+        await bec.async_save()
+        assert storage["energy_kwh"] == 5.0
+        assert round(storage["wace"], 4) == 1.7167
+        # Migration record for the loaded state, two charges and a discharge
+        assert [e["event_type"] for e in storage["charge_history"]] == [
+            "initial", "charge", "charge", "discharge"
+        ]
 
-    @pytest.mark.asyncio
-    async def test_manual_override_workflow_with_save(self, mock_hass):
+    async def test_manual_override_workflow_with_save(self, mock_hass, memory_store):
         """Test manual override and cost reset workflow."""
-        storage = {}
-        
-        async def mock_save(data):
-            storage.update(data)
-            
-        async def mock_load():
-            return storage if storage else None
+        mock_save, mock_load, storage = memory_store
         
         bec = BatteryEnergyCost(mock_hass, capacity_kwh=15.0)
         bec.store.async_save = mock_save
@@ -187,5 +195,5 @@ class TestIntegrationScenarios:
         
         # WACE should only consider new charge
         # (9*0 + 6*1.5) / 15 = 0.6
-        assert bec.wace == pytest.approx(0.6)
+        assert bec.wace == 0.6
         assert bec.get_soc() == 100.0
@@ -3,6 +3,43 @@ import pytest
 from datetime import datetime, time
 from custom_components.energy_dispatcher.comfort_manager import ComfortManager
 
+# Scheduling instants shared by the tests (datetimes are immutable)
+AT_1000 = datetime(2024, 1, 1, 10, 0)  # Outside the default 22:00-07:00 quiet hours
+AT_2300 = datetime(2024, 1, 1, 23, 0)  # Inside the default quiet hours
+
+
+# ComfortManager is not modified after construction, so the canonical
+# configurations are built once per module and shared between tests.
+@pytest.fixture(scope="module")
+def cost_first_manager():
+    """ComfortManager in cost_first mode with default settings."""
+    return ComfortManager(comfort_priority="cost_first")
+
+
+@pytest.fixture(scope="module")
+def balanced_manager():
+    """ComfortManager in balanced mode with default settings."""
+    return ComfortManager(comfort_priority="balanced")
+
+
+@pytest.fixture(scope="module")
+def daytime_quiet_manager():
+    """ComfortManager with quiet hours 08:00-17:00 (not spanning midnight)."""
+    return ComfortManager(
+        quiet_hours_start="08:00",
+        quiet_hours_end="17:00"
+    )
+
+
+@pytest.fixture(scope="module")
+def comfort_first_manager():
+    """ComfortManager in comfort_first mode with quiet hours 22:00-07:00."""
+    return ComfortManager(
+        comfort_priority="comfort_first",
+        quiet_hours_start="22:00",
+        quiet_hours_end="07:00"
+    )
+
 
 class TestComfortManagerInit:
     """Test ComfortManager initialization."""
@@ -28,6 +65,12 @@ class TestComfortManagerInit:
         assert manager.quiet_hours_end == time(6, 0)
         assert manager.min_battery_peace_of_mind == 30.0
 
+    def test_init_with_seconds_in_time_string(self):
+        """Test that "HH:MM:SS" strings from time selectors are accepted."""
+        manager = ComfortManager(quiet_hours_start="21:45:00", quiet_hours_end="06:15:00")
+        assert manager.quiet_hours_start == time(21, 45)
+        assert manager.quiet_hours_end == time(6, 15)
+
     def test_init_with_time_objects(self):
         """Test initialization with time objects."""
         start = time(21, 0)
@@ -43,59 +86,56 @@ class TestComfortManagerInit:
 class TestQuietHours:
     """Test quiet hours functionality."""
 
-    def test_is_in_quiet_hours_normal_range(self):
+    @pytest.mark.parametrize(
+        "hour,minute,expected",
+        [
+            # Inside quiet hours
+            (10, 0, True),
+            (8, 0, True),
+            (17, 0, True),
+            # Outside quiet hours
+            (7, 59, False),
+            (17, 1, False),
+            (23, 0, False),
+        ],
+    )
+    def test_is_in_quiet_hours_normal_range(self, daytime_quiet_manager, hour, minute, expected):
         """Test quiet hours check for normal time range (08:00-17:00)."""
-        manager = ComfortManager(
-            quiet_hours_start="08:00",
-            quiet_hours_end="17:00"
-        )
-        
-        # Inside quiet hours
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 10, 0)) is True
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 8, 0)) is True
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 17, 0)) is True
-        
-        # Outside quiet hours
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 7, 59)) is False
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 17, 1)) is False
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 23, 0)) is False
-
-    def test_is_in_quiet_hours_spans_midnight(self):
+        assert daytime_quiet_manager.is_in_quiet_hours(datetime(2024, 1, 1, hour, minute)) is expected
+
+    @pytest.mark.parametrize(
+        "hour,minute,expected",
+        [
+            # Inside quiet hours (evening)
+            (22, 0, True),
+            (23, 30, True),
+            # Inside quiet hours (morning)
+            (0, 0, True),
+            (6, 30, True),
+            (7, 0, True),
+            # Outside quiet hours
+            (7, 1, False),
+            (12, 0, False),
+            (21, 59, False),
+        ],
+    )
+    def test_is_in_quiet_hours_spans_midnight(self, comfort_first_manager, hour, minute, expected):
         """Test quiet hours check when range spans midnight (22:00-07:00)."""
-        manager = ComfortManager(
-            quiet_hours_start="22:00",
-            quiet_hours_end="07:00"
-        )
-        
-        # Inside quiet hours (evening)
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 22, 0)) is True
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 23, 30)) is True
-        
-        # Inside quiet hours (morning)
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 0, 0)) is True
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 6, 30)) is True
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 7, 0)) is True
-        
-        # Outside quiet hours
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 7, 1)) is False
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 12, 0)) is False
-        assert manager.is_in_quiet_hours(datetime(2024, 1, 1, 21, 59)) is False
+        assert comfort_first_manager.is_in_quiet_hours(datetime(2024, 1, 1, hour, minute)) is expected
 
 
 class TestCostFirstMode:
     """Test cost_first priority mode."""
 
-    def test_cost_first_accepts_all_recommendations(self):
+    def test_cost_first_accepts_all_recommendations(self, cost_first_manager):
         """Test that cost_first mode accepts all recommendations."""
-        manager = ComfortManager(comfort_priority="cost_first")
-        
         recommendations = [
             {"action": "discharge", "user_impact": "high", "savings_sek": 1.0, "inconvenience_score": 10},
             {"action": "discharge", "user_impact": "medium", "savings_sek": 5.0, "inconvenience_score": 5},
             {"action": "charge", "user_impact": "low", "savings_sek": 10.0, "inconvenience_score": 1},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = cost_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=10.0
         )
@@ -127,10 +167,8 @@ class TestCostFirstMode:
 class TestBalancedMode:
     """Test balanced priority mode."""
 
-    def test_balanced_filters_by_savings_ratio(self):
+    def test_balanced_filters_by_savings_ratio(self, balanced_manager):
         """Test that balanced mode filters by savings/inconvenience ratio."""
-        manager = ComfortManager(comfort_priority="balanced")
-        
         recommendations = [
             {"action": "charge", "savings_sek": 10.0, "inconvenience_score": 2.0},  # Ratio 5.0 > 2.0 ✓
             {"action": "discharge", "savings_sek": 5.0, "inconvenience_score": 5.0},  # Ratio 1.0 <= 2.0 ✗
@@ -138,7 +176,7 @@ class TestBalancedMode:
             {"action": "discharge", "savings_sek": 2.0, "inconvenience_score": 1.0},  # Ratio 2.0 <= 2.0 ✗
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = balanced_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=50.0
         )
@@ -176,10 +214,8 @@ class TestBalancedMode:
 class TestComfortFirstMode:
     """Test comfort_first priority mode."""
 
-    def test_comfort_first_filters_by_user_impact(self):
+    def test_comfort_first_filters_by_user_impact(self, comfort_first_manager):
         """Test that comfort_first mode only accepts low impact recommendations."""
-        manager = ComfortManager(comfort_priority="comfort_first")
-        
         recommendations = [
             {"action": "charge", "user_impact": "low", "savings_sek": 5.0},
             {"action": "discharge", "user_impact": "medium", "savings_sek": 10.0},
@@ -187,7 +223,7 @@ class TestComfortFirstMode:
             {"action": "discharge", "user_impact": "low", "savings_sek": 3.0},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=80.0
         )
@@ -196,16 +232,14 @@ class TestComfortFirstMode:
         assert all(rec["user_impact"] == "low" for rec in filtered)
         assert len(filtered_out) == 2
 
-    def test_comfort_first_filters_discharge_when_soc_low(self):
+    def test_comfort_first_filters_discharge_when_soc_low(self, comfort_first_manager):
         """Test that comfort_first filters discharge when battery SOC < 70%."""
-        manager = ComfortManager(comfort_priority="comfort_first")
-        
         recommendations = [
             {"action": "discharge", "user_impact": "low", "savings_sek": 10.0},
             {"action": "charge", "user_impact": "low", "savings_sek": 5.0},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=60.0  # Below 70%
         )
@@ -216,15 +250,13 @@ class TestComfortFirstMode:
         assert filtered_out[0]["action"] == "discharge"
         assert "battery_soc_too_low" in filtered_out[0]["filtered_by_comfort"]
 
-    def test_comfort_first_allows_discharge_when_soc_high(self):
+    def test_comfort_first_allows_discharge_when_soc_high(self, comfort_first_manager):
         """Test that comfort_first allows discharge when battery SOC >= 70%."""
-        manager = ComfortManager(comfort_priority="comfort_first")
-        
         recommendations = [
             {"action": "discharge", "user_impact": "low", "savings_sek": 10.0},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=75.0  # Above 70%
         )
@@ -232,30 +264,24 @@ class TestComfortFirstMode:
         assert len(filtered) == 1
         assert len(filtered_out) == 0
 
-    def test_comfort_first_filters_quiet_hours(self):
+    def test_comfort_first_filters_quiet_hours(self, comfort_first_manager):
         """Test that comfort_first filters recommendations during quiet hours."""
-        manager = ComfortManager(
-            comfort_priority="comfort_first",
-            quiet_hours_start="22:00",
-            quiet_hours_end="07:00"
-        )
-        
         recommendations = [
             {
                 "action": "discharge",
                 "user_impact": "low",
-                "recommended_time": datetime(2024, 1, 1, 23, 0),  # During quiet hours
+                "recommended_time": AT_2300,  # During quiet hours
                 "savings_sek": 10.0
             },
             {
                 "action": "charge",
                 "user_impact": "low",
-                "recommended_time": datetime(2024, 1, 1, 10, 0),  # Outside quiet hours
+                "recommended_time": AT_1000,  # Outside quiet hours
                 "savings_sek": 5.0
             },
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=80.0
         )
@@ -265,14 +291,8 @@ class TestComfortFirstMode:
         assert len(filtered_out) == 1
         assert "in_quiet_hours" in filtered_out[0]["filtered_by_comfort"]
 
-    def test_comfort_first_handles_dict_recommended_time(self):
+    def test_comfort_first_handles_dict_recommended_time(self, comfort_first_manager):
         """Test that comfort_first handles dict format for recommended_time."""
-        manager = ComfortManager(
-            comfort_priority="comfort_first",
-            quiet_hours_start="22:00",
-            quiet_hours_end="07:00"
-        )
-        
         recommendations = [
             {
                 "action": "discharge",
@@ -288,7 +308,7 @@ class TestComfortFirstMode:
             },
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=80.0
         )
@@ -301,14 +321,12 @@ class TestComfortFirstMode:
 class TestShouldAllowOperation:
     """Test should_allow_operation method."""
 
-    def test_cost_first_allows_all_operations(self):
+    def test_cost_first_allows_all_operations(self, cost_first_manager):
         """Test that cost_first allows all operations."""
-        manager = ComfortManager(comfort_priority="cost_first")
-        
-        allowed, reason = manager.should_allow_operation(
+        allowed, reason = cost_first_manager.should_allow_operation(
             "discharge",
             battery_soc=10.0,
-            scheduled_time=datetime(2024, 1, 1, 23, 0)
+            scheduled_time=AT_2300
         )
         
         assert allowed is True
@@ -337,42 +355,30 @@ class TestShouldAllowOperation:
         assert allowed is True
         assert reason == "allowed"
 
-    def test_comfort_first_checks_quiet_hours(self):
+    def test_comfort_first_checks_quiet_hours(self, comfort_first_manager):
         """Test that comfort_first checks quiet hours for operations."""
-        manager = ComfortManager(
-            comfort_priority="comfort_first",
-            quiet_hours_start="22:00",
-            quiet_hours_end="07:00"
-        )
-        
         # During quiet hours
-        allowed, reason = manager.should_allow_operation(
+        allowed, reason = comfort_first_manager.should_allow_operation(
             "discharge",
-            scheduled_time=datetime(2024, 1, 1, 23, 0)
+            scheduled_time=AT_2300
         )
         assert allowed is False
         assert reason == "in_quiet_hours"
         
         # Outside quiet hours
-        allowed, reason = manager.should_allow_operation(
+        allowed, reason = comfort_first_manager.should_allow_operation(
             "discharge",
-            scheduled_time=datetime(2024, 1, 1, 10, 0)
+            scheduled_time=AT_1000
         )
         assert allowed is True
         assert reason == "allowed"
 
-    def test_comfort_first_allows_charge_during_quiet_hours(self):
+    def test_comfort_first_allows_charge_during_quiet_hours(self, comfort_first_manager):
         """Test that comfort_first allows charging during quiet hours."""
-        manager = ComfortManager(
-            comfort_priority="comfort_first",
-            quiet_hours_start="22:00",
-            quiet_hours_end="07:00"
-        )
-        
         # Charging during quiet hours should be allowed
-        allowed, reason = manager.should_allow_operation(
+        allowed, reason = comfort_first_manager.should_allow_operation(
             "charge",
-            scheduled_time=datetime(2024, 1, 1, 23, 0)
+            scheduled_time=AT_2300
         )
         assert allowed is True
         assert reason == "allowed"
@@ -390,15 +396,13 @@ class TestEdgeCases:
         assert filtered == []
         assert filtered_out == []
 
-    def test_none_battery_soc(self):
+    def test_none_battery_soc(self, balanced_manager):
         """Test handling when battery_soc is None."""
-        manager = ComfortManager(comfort_priority="balanced")
-        
         recommendations = [
             {"action": "discharge", "savings_sek": 10.0, "inconvenience_score": 2.0},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = balanced_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=None
         )
@@ -406,15 +410,13 @@ class TestEdgeCases:
         # Should still work without battery_soc
         assert len(filtered) == 1
 
-    def test_zero_inconvenience_score(self):
+    def test_zero_inconvenience_score(self, balanced_manager):
         """Test handling of zero inconvenience_score (division by zero)."""
-        manager = ComfortManager(comfort_priority="balanced")
-        
         recommendations = [
             {"action": "charge", "savings_sek": 5.0, "inconvenience_score": 0},
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = balanced_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=50.0
         )
@@ -423,15 +425,13 @@ class TestEdgeCases:
         # Ratio becomes 5.0 / 0.1 = 50.0 > 2.0, so should pass
         assert len(filtered) == 1
 
-    def test_missing_user_impact_defaults_to_medium(self):
+    def test_missing_user_impact_defaults_to_medium(self, comfort_first_manager):
         """Test that missing user_impact defaults to 'medium'."""
-        manager = ComfortManager(comfort_priority="comfort_first")
-        
         recommendations = [
             {"action": "charge"},  # No user_impact specified
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=80.0
         )
@@ -440,15 +440,13 @@ class TestEdgeCases:
         assert len(filtered) == 0
         assert len(filtered_out) == 1
 
-    def test_recommendation_without_recommended_time(self):
+    def test_recommendation_without_recommended_time(self, comfort_first_manager):
         """Test handling of recommendation without recommended_time."""
-        manager = ComfortManager(comfort_priority="comfort_first")
-        
         recommendations = [
             {"action": "charge", "user_impact": "low"},  # No recommended_time
         ]
         
-        filtered, filtered_out = manager.optimize_with_comfort_balance(
+        filtered, filtered_out = comfort_first_manager.optimize_with_comfort_balance(
             recommendations,
             battery_soc=80.0
         )
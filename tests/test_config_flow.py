@@ -1,8 +1,9 @@
 """Unit tests for config_flow module."""
 import pytest
-from unittest.mock import MagicMock, AsyncMock
+from types import SimpleNamespace
 
 from custom_components.energy_dispatcher.config_flow import (
+    _CLOUD_KEYS,
     _available_weather_entities,
     EnergyDispatcherConfigFlow,
 )
@@ -20,31 +21,73 @@ class MockStates:
     """Mock Home Assistant states manager."""
     
     def __init__(self, weather_states=None):
-        self._weather_states = weather_states or []
+        self._states_by_domain = {"weather": weather_states or []}
     
     def async_all(self, domain):
         """Return all states for a given domain."""
-        if domain == "weather":
-            return self._weather_states
-        return []
+        return self._states_by_domain.get(domain, [])
 
 
-@pytest.fixture
+class RecordingStates(MockStates):
+    """Mock states manager that records the domains async_all was asked for."""
+
+    def __init__(self, weather_states=None):
+        super().__init__(weather_states)
+        self.requested_domains = []
+
+    def async_all(self, domain=None):
+        """Record the domain and return its states."""
+        self.requested_domains.append(domain)
+        return super().async_all(domain)
+
+
+class RaisingStates:
+    """Mock states manager whose async_all raises the given error."""
+
+    def __init__(self, error):
+        self._error = error
+
+    def async_all(self, domain):
+        """Raise the configured error."""
+        raise self._error
+
+
+# Weather states are only read by _available_weather_entities, so each
+# scenario is built once at import and shared by the tests below.
+WEATHER_FIXTURES = {
+    "cloudiness": [MockState("weather.home", {"cloudiness": 50, "temperature": 20})],
+    "cloud_coverage": [MockState("weather.forecast", {"cloud_coverage": 75})],
+    "cloud_cover": [MockState("weather.openweather", {"cloud_cover": 25})],
+    "cloud": [MockState("weather.met", {"cloud": 60})],
+    "mixed": [
+        MockState("weather.home", {"cloudiness": 50}),
+        MockState("weather.no_cloud", {"temperature": 20, "humidity": 70}),
+        MockState("weather.forecast", {"cloud_coverage": 75}),
+    ],
+    "multiple_cloud_attributes": [
+        MockState("weather.complex", {
+            "cloudiness": 50,
+            "cloud_coverage": 50,
+            "temperature": 20
+        })
+    ],
+    "empty_attributes": [MockState("weather.empty", {})],
+}
+
+
+@pytest.fixture(scope="module")
 def mock_hass_with_states():
-    """Create a mock Home Assistant instance with states attribute."""
-    hass = MagicMock()
-    hass.states = MockStates()
-    return hass
+    """Create a stub Home Assistant instance with states attribute.
+
+    Shared by the module; every test assigns its own ``states``.
+    """
+    return SimpleNamespace(states=MockStates())
 
 
 @pytest.fixture
 def mock_hass_without_states():
-    """Create a mock Home Assistant instance without states attribute."""
-    hass = MagicMock(spec=[])  # spec=[] ensures no attributes
-    # Explicitly delete states if it exists
-    if hasattr(hass, 'states'):
-        delattr(hass, 'states')
-    return hass
+    """Create a stub Home Assistant instance without states attribute."""
+    return SimpleNamespace()
 
 
 class TestAvailableWeatherEntities:
@@ -66,110 +109,59 @@ class TestAvailableWeatherEntities:
         result = _available_weather_entities(mock_hass_with_states)
         assert result == []
 
-    def test_hass_with_weather_entity_cloudiness(self, mock_hass_with_states):
-        """Test weather entity with cloudiness attribute is detected."""
-        weather_states = [
-            MockState("weather.home", {"cloudiness": 50, "temperature": 20})
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
-        result = _available_weather_entities(mock_hass_with_states)
-        assert len(result) == 1
-        assert "weather.home" in result
-
-    def test_hass_with_weather_entity_cloud_coverage(self, mock_hass_with_states):
-        """Test weather entity with cloud_coverage attribute is detected."""
-        weather_states = [
-            MockState("weather.forecast", {"cloud_coverage": 75})
-        ]
+    @pytest.mark.parametrize("attr", ["cloudiness", "cloud_coverage", "cloud_cover", "cloud"])
+    def test_hass_with_weather_entity_cloud_attribute(self, mock_hass_with_states, attr):
+        """Test weather entity with any supported cloud attribute is detected."""
+        weather_states = WEATHER_FIXTURES[attr]
         mock_hass_with_states.states = MockStates(weather_states)
         result = _available_weather_entities(mock_hass_with_states)
-        assert len(result) == 1
-        assert "weather.forecast" in result
-
-    def test_hass_with_weather_entity_cloud_cover(self, mock_hass_with_states):
-        """Test weather entity with cloud_cover attribute is detected."""
-        weather_states = [
-            MockState("weather.openweather", {"cloud_cover": 25})
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
-        result = _available_weather_entities(mock_hass_with_states)
-        assert len(result) == 1
-        assert "weather.openweather" in result
-
-    def test_hass_with_weather_entity_cloud(self, mock_hass_with_states):
-        """Test weather entity with cloud attribute is detected."""
-        weather_states = [
-            MockState("weather.met", {"cloud": 60})
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
-        result = _available_weather_entities(mock_hass_with_states)
-        assert len(result) == 1
-        assert "weather.met" in result
+        assert result == [weather_states[0].entity_id]
 
     def test_hass_filters_weather_without_cloud_data(self, mock_hass_with_states):
         """Test that weather entities without cloud attributes are filtered out."""
-        weather_states = [
-            MockState("weather.home", {"cloudiness": 50}),
-            MockState("weather.no_cloud", {"temperature": 20, "humidity": 70}),
-            MockState("weather.forecast", {"cloud_coverage": 75}),
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
+        mock_hass_with_states.states = MockStates(WEATHER_FIXTURES["mixed"])
         result = _available_weather_entities(mock_hass_with_states)
         assert len(result) == 2
-        assert "weather.home" in result
-        assert "weather.forecast" in result
-        assert "weather.no_cloud" not in result
+        assert set(result) == {"weather.home", "weather.forecast"}
 
     def test_hass_with_multiple_cloud_attributes(self, mock_hass_with_states):
         """Test weather entity with multiple cloud attributes."""
-        weather_states = [
-            MockState("weather.complex", {
-                "cloudiness": 50,
-                "cloud_coverage": 50,
-                "temperature": 20
-            })
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
+        mock_hass_with_states.states = MockStates(WEATHER_FIXTURES["multiple_cloud_attributes"])
         result = _available_weather_entities(mock_hass_with_states)
-        assert len(result) == 1
-        assert "weather.complex" in result
+        assert result == ["weather.complex"]
 
     def test_hass_with_empty_attributes(self, mock_hass_with_states):
         """Test weather entity with no attributes."""
-        weather_states = [
-            MockState("weather.empty", {})
-        ]
-        mock_hass_with_states.states = MockStates(weather_states)
+        mock_hass_with_states.states = MockStates(WEATHER_FIXTURES["empty_attributes"])
         result = _available_weather_entities(mock_hass_with_states)
         assert result == []
 
-    def test_hass_with_states_none(self):
-        """Test that hass.states = None is handled gracefully."""
-        hass = MagicMock()
-        hass.states = None
-        result = _available_weather_entities(hass)
-        assert result == []
-
-    def test_hass_with_states_no_async_all(self):
-        """Test that hass.states without async_all method is handled gracefully."""
-        hass = MagicMock()
-        hass.states = object()  # Plain object without async_all
-        result = _available_weather_entities(hass)
-        assert result == []
-
-    def test_hass_with_async_all_raising_error(self):
-        """Test that errors from async_all are handled gracefully."""
-        hass = MagicMock()
-        hass.states = MagicMock()
-        hass.states.async_all = MagicMock(side_effect=AttributeError("Test error"))
-        result = _available_weather_entities(hass)
-        assert result == []
-
-    def test_hass_with_async_all_raising_type_error(self):
-        """Test that TypeError from async_all is handled gracefully."""
-        hass = MagicMock()
-        hass.states = MagicMock()
-        hass.states.async_all = MagicMock(side_effect=TypeError("Test error"))
+    def test_async_all_called_with_domain(self, mock_hass_with_states):
+        """Test that only the weather domain is requested from the state machine."""
+        states = RecordingStates(WEATHER_FIXTURES["cloud"])
+        mock_hass_with_states.states = states
+        assert _available_weather_entities(mock_hass_with_states) == ["weather.met"]
+        assert states.requested_domains == ["weather"]
+
+    def test_cloud_keys_match_supported_attributes(self):
+        """Test that _CLOUD_KEYS lists exactly the supported cloud attributes."""
+        assert _CLOUD_KEYS == {"cloudiness", "cloud_coverage", "cloud_cover", "cloud"}
+        assert not _CLOUD_KEYS.isdisjoint({"temperature", "cloud_cover"})
+        assert _CLOUD_KEYS.isdisjoint({"temperature", "humidity", "clouds"})
+
+    @pytest.mark.parametrize(
+        "states",
+        [
+            None,
+            object(),  # Plain object without async_all
+            RaisingStates(AttributeError("Test error")),
+            RaisingStates(TypeError("Test error")),
+        ],
+        ids=["states_none", "no_async_all", "async_all_attribute_error", "async_all_type_error"],
+    )
+    def test_hass_with_unusable_states(self, states):
+        """Test that missing, incomplete or failing hass.states is handled gracefully."""
+        hass = SimpleNamespace(states=states)
         result = _available_weather_entities(hass)
         assert result == []
 
@@ -179,15 +171,8 @@ class TestOptionsFlowInitialization:
 
     def test_options_flow_can_be_instantiated_without_arguments(self):
         """Test that EnergyDispatcherOptionsFlowHandler can be created without passing config_entry."""
-        from custom_components.energy_dispatcher.config_flow import (
-            EnergyDispatcherConfigFlow,
-        )
-        from homeassistant import config_entries
-        
-        # Create a mock config entry
-        mock_config_entry = MagicMock(spec=config_entries.ConfigEntry)
-        mock_config_entry.data = {}
-        mock_config_entry.options = {}
+        # Create a stub config entry
+        mock_config_entry = SimpleNamespace(data={}, options={})
         
         # This should not raise TypeError - the modern pattern doesn't pass config_entry
         flow_handler = EnergyDispatcherConfigFlow.async_get_options_flow(mock_config_entry)
@@ -10,75 +10,72 @@ from custom_components.energy_dispatcher.models import (
 )
 
 
-@pytest.fixture
+# Fixed reference hour: nothing here depends on wall-clock time, and a frozen
+# value keeps the sample prices aligned with every test's "now".
+_NOW = datetime(2024, 1, 1)
+
+# Hour offsets shared by the 24-hour price series below
+_HOURS = tuple(timedelta(hours=i) for i in range(24))
+
+# 24 hours of varying prices
+_PRICE_PATTERN = (
+    1.0, 1.2, 1.0, 0.8,  # Night (cheap)
+    0.9, 1.1, 1.3, 2.0,  # Morning
+    2.5, 3.5, 4.0, 3.8,  # Peak morning (high)
+    2.2, 1.8, 1.5, 1.3,  # Midday
+    1.4, 1.6, 2.8, 3.2,  # Evening
+    3.5, 3.0, 2.0, 1.5,  # Night
+)
+
+
+@pytest.fixture(scope="module")
 def strategy():
-    """Create a CostStrategy instance."""
+    """Create a CostStrategy instance.
+
+    Shared by the module; tests that change thresholds build their own.
+    """
     thresholds = CostThresholds(cheap_max=1.5, high_min=3.0)
     return CostStrategy(thresholds)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_prices():
-    """Generate sample price points."""
-    now = datetime.now().replace(minute=0, second=0, microsecond=0)
-    prices = []
-    
-    # Create 24 hours of varying prices
-    price_pattern = [
-        1.0, 1.2, 1.0, 0.8,  # Night (cheap)
-        0.9, 1.1, 1.3, 2.0,  # Morning
-        2.5, 3.5, 4.0, 3.8,  # Peak morning (high)
-        2.2, 1.8, 1.5, 1.3,  # Midday
-        1.4, 1.6, 2.8, 3.2,  # Evening
-        3.5, 3.0, 2.0, 1.5,  # Night
-    ]
-    
-    for i, price in enumerate(price_pattern):
-        prices.append(
-            PricePoint(
-                time=now + timedelta(hours=i),
-                spot_sek_per_kwh=price * 0.8,
-                enriched_sek_per_kwh=price,
-            )
+    """Generate sample price points (read-only, shared by the module)."""
+    now = _NOW
+    return [
+        PricePoint(
+            time=now + offset,
+            spot_sek_per_kwh=price * 0.8,
+            enriched_sek_per_kwh=price,
         )
-    
-    return prices
+        for offset, price in zip(_HOURS, _PRICE_PATTERN)
+    ]
 
 
 class TestCostClassification:
     """Test cost classification functionality."""
 
-    def test_classify_cheap(self, strategy):
-        """Test cheap price classification."""
-        level = strategy.classify_price(1.0)
-        assert level == CostLevel.CHEAP
-
-    def test_classify_medium(self, strategy):
-        """Test medium price classification."""
-        level = strategy.classify_price(2.0)
-        assert level == CostLevel.MEDIUM
-
-    def test_classify_high(self, strategy):
-        """Test high price classification."""
-        level = strategy.classify_price(3.5)
-        assert level == CostLevel.HIGH
-
-    def test_classify_boundary_cheap(self, strategy):
-        """Test boundary at cheap threshold."""
-        level = strategy.classify_price(1.5)
-        assert level == CostLevel.CHEAP
-
-    def test_classify_boundary_high(self, strategy):
-        """Test boundary at high threshold."""
-        level = strategy.classify_price(3.0)
-        assert level == CostLevel.HIGH
+    @pytest.mark.parametrize(
+        "price,expected",
+        [
+            pytest.param(1.0, CostLevel.CHEAP, id="cheap"),
+            pytest.param(2.0, CostLevel.MEDIUM, id="medium"),
+            pytest.param(3.5, CostLevel.HIGH, id="high"),
+            pytest.param(1.5, CostLevel.CHEAP, id="boundary_cheap"),
+            pytest.param(3.0, CostLevel.HIGH, id="boundary_high"),
+        ],
+    )
+    def test_classify(self, strategy, price, expected):
+        """Test price classification, including both threshold boundaries."""
+        assert strategy.classify_price(price) == expected
 
 
 class TestThresholds:
     """Test threshold management."""
 
-    def test_update_thresholds(self, strategy):
+    def test_update_thresholds(self):
         """Test updating thresholds."""
+        strategy = CostStrategy(CostThresholds(cheap_max=1.5, high_min=3.0))
         strategy.update_thresholds(cheap_max=2.0, high_min=4.0)
         
         assert strategy.thresholds.cheap_max == 2.0
@@ -111,11 +108,8 @@ class TestHighCostWindows:
 
     def test_predict_windows_no_high_cost(self, strategy):
         """Test when no high-cost periods exist."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        cheap_prices = [
-            PricePoint(now + timedelta(hours=i), 0.5, 1.0)
-            for i in range(24)
-        ]
+        now = _NOW
+        cheap_prices = [PricePoint(now + offset, 0.5, 1.0) for offset in _HOURS]
         
         windows = strategy.predict_high_cost_windows(cheap_prices, now, 24)
         assert len(windows) == 0
@@ -139,11 +133,8 @@ class TestBatteryReserve:
 
     def test_reserve_no_high_cost(self, strategy):
         """Test reserve when no high-cost periods."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        cheap_prices = [
-            PricePoint(now + timedelta(hours=i), 0.5, 1.0)
-            for i in range(24)
-        ]
+        now = _NOW
+        cheap_prices = [PricePoint(now + offset, 0.5, 1.0) for offset in _HOURS]
         
         reserve = strategy.calculate_battery_reserve(
             cheap_prices,
@@ -275,7 +266,7 @@ class TestCostSummary:
 
     def test_summary_empty_prices(self, strategy):
         """Test summary with no prices."""
-        now = datetime.now()
+        now = _NOW
         summary = strategy.get_cost_summary([], now, 24)
         
         assert summary["total_hours"] == 0
@@ -286,95 +277,46 @@ class TestCostSummary:
 class TestWeatherAwareReserve:
     """Test weather-aware battery reserve adjustments."""
 
-    def test_reserve_without_weather_adjustment(self, strategy, sample_prices):
-        """Test battery reserve calculation without weather adjustment."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        
-        # Calculate reserve without weather adjustment
-        reserve = strategy.calculate_battery_reserve(
-            sample_prices, now, battery_capacity_kwh=30.0, current_soc=50.0
+    @pytest.fixture(scope="class")
+    def baseline_reserve(self, strategy, sample_prices):
+        """Reserve without weather adjustment, shared by the comparisons below."""
+        return strategy.calculate_battery_reserve(
+            sample_prices, _NOW, battery_capacity_kwh=30.0, current_soc=50.0
         )
-        
-        # Should be > 0 since we have high-cost periods
-        assert reserve > 0
 
-    def test_reserve_with_minor_weather_adjustment(self, strategy, sample_prices):
-        """Test battery reserve with minor weather adjustment (<20% reduction)."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        
-        # Minor reduction (15%) - should not increase reserve
-        weather_adjustment = {
-            "reduction_percentage": 15.0,
-            "avg_adjustment_factor": 0.85,
-        }
-        
-        reserve_with_weather = strategy.calculate_battery_reserve(
-            sample_prices,
-            now,
-            battery_capacity_kwh=30.0,
-            current_soc=50.0,
-            weather_adjustment=weather_adjustment,
-        )
-        
-        reserve_without_weather = strategy.calculate_battery_reserve(
-            sample_prices, now, battery_capacity_kwh=30.0, current_soc=50.0
-        )
-        
-        # Should be same (no increase for <20% reduction)
-        assert reserve_with_weather == pytest.approx(reserve_without_weather, rel=0.01)
-
-    def test_reserve_with_moderate_weather_adjustment(self, strategy, sample_prices):
-        """Test battery reserve with moderate weather adjustment (20-40% reduction)."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        
-        # Moderate reduction (30%) - should increase reserve by 10%
-        weather_adjustment = {
-            "reduction_percentage": 30.0,
-            "avg_adjustment_factor": 0.70,
-        }
-        
-        reserve_with_weather = strategy.calculate_battery_reserve(
-            sample_prices,
-            now,
-            battery_capacity_kwh=30.0,
-            current_soc=50.0,
-            weather_adjustment=weather_adjustment,
-        )
-        
-        reserve_without_weather = strategy.calculate_battery_reserve(
-            sample_prices, now, battery_capacity_kwh=30.0, current_soc=50.0
-        )
-        
-        # Should be increased by ~10%
-        assert reserve_with_weather > reserve_without_weather
-        assert reserve_with_weather == pytest.approx(
-            reserve_without_weather * 1.10, rel=0.05
-        )
-
-    def test_reserve_with_severe_weather_adjustment(self, strategy, sample_prices):
-        """Test battery reserve with severe weather adjustment (>60% reduction)."""
-        now = datetime.now().replace(minute=0, second=0, microsecond=0)
-        
-        # Severe reduction (70%) - should increase reserve by 20%
+    def test_reserve_without_weather_adjustment(self, baseline_reserve):
+        """Test battery reserve calculation without weather adjustment."""
+        # Should be > 0 since we have high-cost periods
+        assert baseline_reserve > 0
+
+    @pytest.mark.parametrize(
+        "reduction,factor,multiplier,rel",
+        [
+            # Minor reduction (<20%): reserve unchanged
+            pytest.param(15.0, 0.85, 1.00, 0.01, id="minor"),
+            # Moderate reduction (20-40%): reserve increased by ~10%
+            pytest.param(30.0, 0.70, 1.10, 0.05, id="moderate"),
+            # Severe reduction (>60%): reserve increased by ~20%
+            pytest.param(70.0, 0.30, 1.20, 0.05, id="severe"),
+        ],
+    )
+    def test_reserve_with_weather_adjustment(
+        self, strategy, sample_prices, baseline_reserve, reduction, factor, multiplier, rel
+    ):
+        """Test battery reserve scaling with forecast solar reduction."""
         weather_adjustment = {
-            "reduction_percentage": 70.0,
-            "avg_adjustment_factor": 0.30,
+            "reduction_percentage": reduction,
+            "avg_adjustment_factor": factor,
         }
         
         reserve_with_weather = strategy.calculate_battery_reserve(
             sample_prices,
-            now,
+            _NOW,
             battery_capacity_kwh=30.0,
             current_soc=50.0,
             weather_adjustment=weather_adjustment,
         )
         
-        reserve_without_weather = strategy.calculate_battery_reserve(
-            sample_prices, now, battery_capacity_kwh=30.0, current_soc=50.0
-        )
-        
-        # Should be increased by ~20%
-        assert reserve_with_weather > reserve_without_weather
-        assert reserve_with_weather == pytest.approx(
-            reserve_without_weather * 1.20, rel=0.05
-        )
+        if multiplier > 1.0:
+            assert reserve_with_weather > baseline_reserve
+        assert reserve_with_weather == pytest.approx(baseline_reserve * multiplier, rel=rel)
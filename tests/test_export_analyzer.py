@@ -4,183 +4,121 @@ import pytest
 from custom_components.energy_dispatcher.export_analyzer import ExportAnalyzer
 
 
-@pytest.fixture
-def analyzer_never():
-    """Create an ExportAnalyzer with 'never' mode."""
+def make_analyzer(export_mode):
+    """Create an ExportAnalyzer with the shared test thresholds."""
     return ExportAnalyzer(
-        export_mode="never",
+        export_mode=export_mode,
         min_export_price_sek_per_kwh=3.0,
         battery_degradation_cost_per_cycle_sek=0.50,
     )
 
 
-@pytest.fixture
+# should_export_energy does not modify the analyzer, so the read-only fixtures
+# are shared by the module; TestUpdateSettings uses the *_mut variants.
+@pytest.fixture(scope="module")
+def analyzer_never():
+    """Create an ExportAnalyzer with 'never' mode."""
+    return make_analyzer("never")
+
+
+@pytest.fixture(scope="module")
 def analyzer_excess_solar():
     """Create an ExportAnalyzer with 'excess_solar_only' mode."""
-    return ExportAnalyzer(
-        export_mode="excess_solar_only",
-        min_export_price_sek_per_kwh=3.0,
-        battery_degradation_cost_per_cycle_sek=0.50,
-    )
+    return make_analyzer("excess_solar_only")
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def analyzer_opportunistic():
     """Create an ExportAnalyzer with 'peak_price_opportunistic' mode."""
-    return ExportAnalyzer(
-        export_mode="peak_price_opportunistic",
-        min_export_price_sek_per_kwh=3.0,
-        battery_degradation_cost_per_cycle_sek=0.50,
-    )
-
-
-class TestNeverExportMode:
-    """Test cases for 'never' export mode."""
-
-    def test_never_export_high_price(self, analyzer_never):
-        """Test that 'never' mode always returns False even with high prices."""
-        result = analyzer_never.should_export_energy(
-            spot_price=6.0,
-            purchase_price=7.0,
-            export_price=6.0,
-            battery_soc=90.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=2000.0,
-        )
-        
-        assert result["should_export"] is False
-        assert "never" in result["reason"].lower()
-
-    def test_never_export_full_battery(self, analyzer_never):
-        """Test that 'never' mode returns False even with full battery and solar excess."""
-        result = analyzer_never.should_export_energy(
-            spot_price=3.5,
-            purchase_price=4.0,
-            export_price=3.5,
-            battery_soc=98.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=3000.0,
-        )
-        
-        assert result["should_export"] is False
-        assert "never" in result["reason"].lower()
-
-
-class TestExcessSolarOnlyMode:
-    """Test cases for 'excess_solar_only' export mode."""
+    return make_analyzer("peak_price_opportunistic")
 
-    def test_export_when_battery_full_and_excess_solar(self, analyzer_excess_solar):
-        """Test export is recommended when battery is full and solar producing excess."""
-        result = analyzer_excess_solar.should_export_energy(
-            spot_price=2.5,
-            purchase_price=3.0,
-            export_price=2.5,
-            battery_soc=96.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=2500.0,
-        )
-        
-        assert result["should_export"] is True
-        assert result["export_power_w"] == 2500
-        assert "full" in result["reason"].lower()
-        assert "excess solar" in result["reason"].lower()
-
-    def test_no_export_battery_not_full(self, analyzer_excess_solar):
-        """Test no export when battery is not full even with solar excess."""
-        result = analyzer_excess_solar.should_export_energy(
-            spot_price=2.5,
-            purchase_price=3.0,
-            export_price=2.5,
-            battery_soc=85.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=2500.0,
-        )
-        
-        assert result["should_export"] is False
-        assert "not full" in result["reason"].lower()
-
-    def test_no_export_no_solar_excess(self, analyzer_excess_solar):
-        """Test no export when battery is full but no solar excess."""
-        result = analyzer_excess_solar.should_export_energy(
-            spot_price=2.5,
-            purchase_price=3.0,
-            export_price=2.5,
-            battery_soc=96.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=500.0,
-        )
-        
-        assert result["should_export"] is False
-
-    def test_no_export_price_too_low(self, analyzer_excess_solar):
-        """Test no export when price is below conservative threshold."""
-        result = analyzer_excess_solar.should_export_energy(
-            spot_price=1.5,
-            purchase_price=2.0,
-            export_price=1.5,
-            battery_soc=96.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=2500.0,
-        )
-        
-        assert result["should_export"] is False
-        assert "too low" in result["reason"].lower()
 
+@pytest.fixture
+def analyzer_never_mut():
+    """Create a fresh 'never' mode ExportAnalyzer for tests that change settings."""
+    return make_analyzer("never")
 
-class TestOpportunisticMode:
-    """Test cases for 'peak_price_opportunistic' export mode."""
 
-    def test_export_exceptionally_high_price(self, analyzer_opportunistic):
-        """Test export when spot price is exceptionally high (>5 SEK/kWh)."""
-        result = analyzer_opportunistic.should_export_energy(
-            spot_price=6.0,
-            purchase_price=7.0,
-            export_price=6.0,
-            battery_soc=85.0,
+@pytest.fixture
+def analyzer_opportunistic_mut():
+    """Create a fresh 'peak_price_opportunistic' ExportAnalyzer for tests that change settings."""
+    return make_analyzer("peak_price_opportunistic")
+
+
+_MODE_FIXTURES = {
+    "never": "analyzer_never",
+    "excess_solar_only": "analyzer_excess_solar",
+    "peak_price_opportunistic": "analyzer_opportunistic",
+}
+
+# (mode, spot, purchase, export price, SOC %, solar excess W,
+#  should export, expected export power W or None, reason fragments)
+# All cases use a 15 kWh battery and no upcoming high-cost hours.
+EXPORT_DECISION_CASES = [
+    # 'never' mode always returns False, even with high prices...
+    pytest.param("never", 6.0, 7.0, 6.0, 90.0, 2000.0, False, None, ("never",),
+                 id="never-high_price"),
+    # ...or with a full battery and solar excess
+    pytest.param("never", 3.5, 4.0, 3.5, 98.0, 3000.0, False, None, ("never",),
+                 id="never-full_battery"),
+    # Battery full and solar producing excess
+    pytest.param("excess_solar_only", 2.5, 3.0, 2.5, 96.0, 2500.0, True, 2500,
+                 ("full", "excess solar"), id="excess_solar-full_with_excess"),
+    pytest.param("excess_solar_only", 2.5, 3.0, 2.5, 85.0, 2500.0, False, None,
+                 ("not full",), id="excess_solar-battery_not_full"),
+    pytest.param("excess_solar_only", 2.5, 3.0, 2.5, 96.0, 500.0, False, None, (),
+                 id="excess_solar-no_solar_excess"),
+    # Price below conservative threshold
+    pytest.param("excess_solar_only", 1.5, 2.0, 1.5, 96.0, 2500.0, False, None,
+                 ("too low",), id="excess_solar-price_too_low"),
+    # Spot price exceptionally high (>5 SEK/kWh)
+    pytest.param("peak_price_opportunistic", 6.0, 7.0, 6.0, 85.0, 0.0, True, 5000,
+                 ("exceptionally high",), id="opportunistic-exceptionally_high_price"),
+    # High price but battery SOC too low
+    pytest.param("peak_price_opportunistic", 6.0, 7.0, 6.0, 70.0, 0.0, False, None, (),
+                 id="opportunistic-high_price_low_soc"),
+    pytest.param("peak_price_opportunistic", 3.0, 3.5, 3.0, 96.0, 2000.0, True, 2000, (),
+                 id="opportunistic-full_with_excess"),
+    # Price below minimum threshold
+    pytest.param("peak_price_opportunistic", 2.5, 3.0, 2.5, 85.0, 0.0, False, None, (),
+                 id="opportunistic-below_minimum"),
+]
+
+
+class TestExportDecision:
+    """Test export decisions across the 'never', 'excess_solar_only' and 'peak_price_opportunistic' modes."""
+
+    @pytest.mark.parametrize(
+        "mode,spot,purchase,export_price,soc,solar,expected,power,reason_frags",
+        EXPORT_DECISION_CASES,
+    )
+    def test_should_export_energy(
+        self, request, mode, spot, purchase, export_price, soc, solar, expected, power, reason_frags
+    ):
+        """Test the export decision, power and reason for each mode."""
+        analyzer = request.getfixturevalue(_MODE_FIXTURES[mode])
+        result = analyzer.should_export_energy(
+            spot_price=spot,
+            purchase_price=purchase,
+            export_price=export_price,
+            battery_soc=soc,
             battery_capacity_kwh=15.0,
             upcoming_high_cost_hours=0,
-            solar_excess_w=0.0,
+            solar_excess_w=solar,
         )
         
-        assert result["should_export"] is True
-        assert result["export_power_w"] == 5000
-        assert "exceptionally high" in result["reason"].lower()
-        assert result["export_price_sek_per_kwh"] == 6.0
+        assert result["should_export"] is expected
+        if power is not None:
+            assert result["export_power_w"] == power
+        if expected:
+            assert result["export_price_sek_per_kwh"] == export_price
+        reason = result["reason"].lower()
+        for fragment in reason_frags:
+            assert fragment in reason
 
-    def test_no_export_high_price_but_low_soc(self, analyzer_opportunistic):
-        """Test no export when price is high but battery SOC is too low."""
-        result = analyzer_opportunistic.should_export_energy(
-            spot_price=6.0,
-            purchase_price=7.0,
-            export_price=6.0,
-            battery_soc=70.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=0.0,
-        )
-        
-        assert result["should_export"] is False
 
-    def test_export_battery_full_excess_solar(self, analyzer_opportunistic):
-        """Test export in opportunistic mode when battery full and solar excess."""
-        result = analyzer_opportunistic.should_export_energy(
-            spot_price=3.0,
-            purchase_price=3.5,
-            export_price=3.0,
-            battery_soc=96.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=2000.0,
-        )
-        
-        assert result["should_export"] is True
-        assert result["export_power_w"] == 2000
+class TestOpportunityCost:
+    """Test opportunity cost in 'peak_price_opportunistic' mode."""
 
     def test_opportunity_cost_calculation(self, analyzer_opportunistic):
         """Test that opportunity cost is calculated when upcoming high cost hours."""
@@ -199,20 +137,6 @@ class TestOpportunisticMode:
             assert result["opportunity_cost"] > 0
             assert result["net_revenue"] > 0
 
-    def test_no_export_below_minimum_threshold(self, analyzer_opportunistic):
-        """Test no export when price is below minimum threshold."""
-        result = analyzer_opportunistic.should_export_energy(
-            spot_price=2.5,
-            purchase_price=3.0,
-            export_price=2.5,
-            battery_soc=85.0,
-            battery_capacity_kwh=15.0,
-            upcoming_high_cost_hours=0,
-            solar_excess_w=0.0,
-        )
-        
-        assert result["should_export"] is False
-
 
 class TestBatteryDegradationCost:
     """Test battery degradation cost consideration."""
@@ -243,31 +167,31 @@ class TestBatteryDegradationCost:
 class TestUpdateSettings:
     """Test updating analyzer settings."""
 
-    def test_update_export_mode(self, analyzer_never):
+    def test_update_export_mode(self, analyzer_never_mut):
         """Test updating export mode."""
-        analyzer_never.update_settings(export_mode="excess_solar_only")
-        assert analyzer_never.export_mode == "excess_solar_only"
+        analyzer_never_mut.update_settings(export_mode="excess_solar_only")
+        assert analyzer_never_mut.export_mode == "excess_solar_only"
 
-    def test_update_min_export_price(self, analyzer_opportunistic):
+    def test_update_min_export_price(self, analyzer_opportunistic_mut):
         """Test updating minimum export price."""
-        analyzer_opportunistic.update_settings(min_export_price_sek_per_kwh=4.0)
-        assert analyzer_opportunistic.min_export_price == 4.0
+        analyzer_opportunistic_mut.update_settings(min_export_price_sek_per_kwh=4.0)
+        assert analyzer_opportunistic_mut.min_export_price == 4.0
 
-    def test_update_degradation_cost(self, analyzer_opportunistic):
+    def test_update_degradation_cost(self, analyzer_opportunistic_mut):
         """Test updating degradation cost."""
-        analyzer_opportunistic.update_settings(battery_degradation_cost_per_cycle_sek=0.75)
-        assert analyzer_opportunistic.degradation_cost == 0.75
+        analyzer_opportunistic_mut.update_settings(battery_degradation_cost_per_cycle_sek=0.75)
+        assert analyzer_opportunistic_mut.degradation_cost == 0.75
 
-    def test_update_multiple_settings(self, analyzer_never):
+    def test_update_multiple_settings(self, analyzer_never_mut):
         """Test updating multiple settings at once."""
-        analyzer_never.update_settings(
+        analyzer_never_mut.update_settings(
             export_mode="peak_price_opportunistic",
             min_export_price_sek_per_kwh=3.5,
             battery_degradation_cost_per_cycle_sek=0.60,
         )
-        assert analyzer_never.export_mode == "peak_price_opportunistic"
-        assert analyzer_never.min_export_price == 3.5
-        assert analyzer_never.degradation_cost == 0.60
+        assert analyzer_never_mut.export_mode == "peak_price_opportunistic"
+        assert analyzer_never_mut.min_export_price == 3.5
+        assert analyzer_never_mut.degradation_cost == 0.60
 
 
 class TestResponseStructure:
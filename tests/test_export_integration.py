@@ -6,13 +6,17 @@ from custom_components.energy_dispatcher.planner import simple_plan, _should_exp
 from custom_components.energy_dispatcher.cost_strategy import CostStrategy, CostThresholds
 
 
-@pytest.fixture
+# The fixtures below are shared by the module; the planner only reads them and
+# they are returned as tuples so no test can modify them by accident.
+
+
+@pytest.fixture(scope="module")
 def base_datetime():
     """Create a base datetime for tests."""
     return datetime(2025, 1, 15, 12, 0, 0)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def prices_2025(base_datetime):
     """Create test prices for 2025 with export prices calculated.
     
@@ -37,10 +41,10 @@ def prices_2025(base_datetime):
             export_sek_per_kwh=export,
         ))
     
-    return prices
+    return tuple(prices)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def prices_2026(base_datetime):
     """Create test prices for 2026 with export prices calculated (no tax return).
     
@@ -62,10 +66,10 @@ def prices_2026(base_datetime):
             export_sek_per_kwh=export,
         ))
     
-    return prices
+    return tuple(prices)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def solar_forecast(base_datetime):
     """Create solar forecast data."""
     solar = []
@@ -78,16 +82,20 @@ def solar_forecast(base_datetime):
             watts=w,
         ))
     
-    return solar
+    return tuple(solar)
+
+
+@pytest.fixture(scope="module")
+def cost_strategy():
+    """Create a CostStrategy instance; simple_plan only reads it."""
+    return CostStrategy(CostThresholds(cheap_max=1.5, high_min=3.0))
 
 
 class TestExportModeNever:
     """Test cases for 'never' export mode."""
     
-    def test_never_export_regardless_of_price(self, base_datetime, prices_2025, solar_forecast):
+    def test_never_export_regardless_of_price(self, base_datetime, prices_2025, solar_forecast, cost_strategy):
         """Test that 'never' mode never exports even with high prices."""
-        cost_strategy = CostStrategy(CostThresholds(cheap_max=1.5, high_min=3.0))
-        
         plan = simple_plan(
             now=base_datetime,
             horizon_hours=8,
@@ -111,10 +119,8 @@ class TestExportModeNever:
 class TestExportModeExcessSolarOnly:
     """Test cases for 'excess_solar_only' export mode."""
     
-    def test_export_when_battery_full_and_solar_excess(self, base_datetime, prices_2025, solar_forecast):
+    def test_export_when_battery_full_and_solar_excess(self, base_datetime, prices_2025, solar_forecast, cost_strategy):
         """Test export only when battery full and solar excess available."""
-        cost_strategy = CostStrategy(CostThresholds(cheap_max=1.5, high_min=3.0))
-        
         plan = simple_plan(
             now=base_datetime,
             horizon_hours=8,
@@ -182,10 +188,8 @@ class TestExportModeExcessSolarOnly:
 class TestExportModePeakPriceOpportunistic:
     """Test cases for 'peak_price_opportunistic' export mode."""
     
-    def test_export_during_profitable_high_prices(self, base_datetime, prices_2025, solar_forecast):
+    def test_export_during_profitable_high_prices(self, base_datetime, prices_2025, solar_forecast, cost_strategy):
         """Test export during high prices when profitable."""
-        cost_strategy = CostStrategy(CostThresholds(cheap_max=1.5, high_min=3.0))
-        
         # Create scenario with very high spot price
         high_price_scenario = []
         for i in range(8):
@@ -267,19 +271,17 @@ class TestExportPriceCalculation:
         """Test export price calculation for 2025 (with tax return)."""
         # Verify 2025 export prices are calculated correctly
         # Export 2025: spot + 0.687
-        for price in prices_2025:
-            expected_export = price.spot_sek_per_kwh + 0.687
-            assert abs(price.export_sek_per_kwh - expected_export) < 0.001, \
-                f"Export price mismatch for spot {price.spot_sek_per_kwh}: expected {expected_export}, got {price.export_sek_per_kwh}"
+        assert [p.export_sek_per_kwh for p in prices_2025] == pytest.approx(
+            [p.spot_sek_per_kwh + 0.687 for p in prices_2025], abs=1e-3
+        )
     
     def test_export_price_2026(self, prices_2026):
         """Test export price calculation for 2026 (no tax return)."""
         # Verify 2026 export prices are calculated correctly
         # Export 2026: spot + 0.087
-        for price in prices_2026:
-            expected_export = price.spot_sek_per_kwh + 0.087
-            assert abs(price.export_sek_per_kwh - expected_export) < 0.001, \
-                f"Export price mismatch for spot {price.spot_sek_per_kwh}: expected {expected_export}, got {price.export_sek_per_kwh}"
+        assert [p.export_sek_per_kwh for p in prices_2026] == pytest.approx(
+            [p.spot_sek_per_kwh + 0.087 for p in prices_2026], abs=1e-3
+        )
     
     def test_export_price_difference_2025_vs_2026(self, base_datetime):
         """Test that 2025 export price is higher than 2026 due to tax return."""
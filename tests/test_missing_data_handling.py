@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, AsyncMock, patch
 from custom_components.energy_dispatcher.coordinator import (
     _interpolate_energy_value,
     _is_data_stale,
+    _safe_float,
     _fill_missing_hourly_data,
     EnergyDispatcherCoordinator,
 )
@@ -76,6 +77,27 @@ class TestInterpolation:
         assert result is None
 
 
+class TestSafeFloat:
+    """Test tolerant float parsing of sensor states."""
+    
+    def test_numeric_strings(self):
+        """Test plain, padded and decimal-comma numbers."""
+        assert _safe_float("10.5") == 10.5
+        assert _safe_float(" -4000 ") == -4000.0
+        assert _safe_float("1,25") == 1.25
+        assert _safe_float(3) == 3.0
+    
+    def test_non_numeric_returns_default(self):
+        """Test that unavailable/unknown/garbage states return the default."""
+        assert _safe_float("unavailable") is None
+        assert _safe_float("unknown", 0.0) == 0.0
+        assert _safe_float(" unavailable ") is None
+        assert _safe_float("nan") is None
+        assert _safe_float(float("nan"), 1.0) == 1.0
+        assert _safe_float("abc") is None
+        assert _safe_float(None, 2.0) == 2.0
+
+
 class TestDataStaleness:
     """Test data staleness checking."""
     
@@ -116,6 +138,12 @@ class TestDataStaleness:
         
         # With 70 minute threshold, should not be stale
         assert _is_data_stale(old, max_age_minutes=70) is False
+    
+    def test_explicit_now(self):
+        """Test staleness against a caller-supplied current time."""
+        last = dt_util.now()
+        assert _is_data_stale(last, max_age_minutes=15, now=last + timedelta(minutes=10)) is False
+        assert _is_data_stale(last, max_age_minutes=15, now=last + timedelta(minutes=20)) is True
 
 
 class TestFillMissingHourlyData: